@@ -8,16 +8,20 @@ API-first with automatic CPU fallback for reliability.
 """
 
 import os
-import io
 import json
 import re
 import time
 import asyncio
 import math
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import random
+import atexit
+import hashlib
+import sqlite3
+import threading
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from collections import OrderedDict
 from datetime import datetime
 from typing import Optional, Dict, List, Tuple
 
@@ -25,7 +29,9 @@ from shiny import App, Inputs, Outputs, Session, reactive, render, ui
 from shiny.types import FileInfo
 import shinyswatch
 from shinywidgets import render_widget, output_widget
-from functools import lru_cache
+import plotly.graph_objects as go
+from functools import lru_cache, partial
+from concurrent.futures import ThreadPoolExecutor
 
 # ============================================================================
 # IMPORTS
@@ -33,11 +39,22 @@ from functools import lru_cache
 
 # Matching algorithms
 from rapidfuzz import fuzz, process
+from sklearn.decomposition import PCA
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+try:
+    import simsimd  # type: ignore
+    SIMSIMD_AVAILABLE = True
+except ImportError:
+    SIMSIMD_AVAILABLE = False
+try:
+    import faiss  # type: ignore
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
 
 # API client for embeddings
-from openai import OpenAI, AsyncOpenAI
+from openai import AsyncOpenAI
 import httpx
 try:
     import h2  # type: ignore
@@ -45,1159 +62,84 @@ try:
 except Exception:
     HTTP2_AVAILABLE = False
 
+# ONNX Runtime backend for the local CPU model (checked without importing; it is loaded lazily)
+import importlib.util
+ONNXRUNTIME_AVAILABLE = importlib.util.find_spec("onnxruntime") is not None
+
+# Multithreaded CSV parsing and substring search kernels
+try:
+    import pyarrow  # type: ignore
+    import pyarrow.compute as pc  # type: ignore
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Text normalization patterns (compiled once)
+_MULTISPACE_RE = re.compile(r'\s+')
+_PUNCT_RE = re.compile(r'[^\w\s,.-]')  # everything except basic punctuation
+
 # ============================================================================
 # STYLE CONFIGURATION 
 # ============================================================================
-custom_css = """
-/* Professional neutral color scheme */
-:root {
-    --primary-color: #475569;
-    --primary-dark: #334155;
-    --secondary-color: #64748b;
-    --success-color: #059669;
-    --warning-color: #d97706;
-    --danger-color: #dc2626;
-    --background: #ffffff;
-    --surface: #f8fafc;
-    --text-primary: #1e293b;
-    --text-secondary: #64748b;
-    --border-color: #e2e8f0;
-    --shadow-sm: 0 1px 2px 0 rgb(0 0 0 / 0.05);
-    --shadow-md: 0 4px 6px -1px rgb(0 0 0 / 0.08);
-    --shadow-lg: 0 10px 15px -3px rgb(0 0 0 / 0.1);
-    --gradient-primary: linear-gradient(135deg, #64748b 0%, #475569 100%);
-}
-
-/* Main container with responsive design */
-.container-fluid {
-    max-width: 1400px;
-    margin: 0 auto;
-    padding: 20px;
-    background: var(--background);
-}
-
-/* NEW: Typography with system font stack */
-body, .container-fluid, .card, .btn, .table {
-    font-family: -apple-system, BlinkMacSystemFont, "Inter", "Segoe UI", "Helvetica Neue", Arial, sans-serif;
-    color: var(--text-primary);
-    line-height: 1.6;
-}
-
-/* Clean header styling */
-.app-header {
-    background: var(--gradient-primary);
-    color: white;
-    padding: 1.25rem 1.25rem; /* NEW: thinner header */
-    border-radius: 12px;
-    margin-bottom: 1.25rem;
-    text-align: center;
-    box-shadow: var(--shadow-md);
-}
-
-.app-header h1 {
-    color: white;
-    margin: 0;
-    font-size: 2rem; /* NEW: smaller title */
-    font-weight: 700;
-    letter-spacing: 0.2px;
-}
-
-.app-header p {
-    color: rgba(255, 255, 255, 0.95);
-    font-size: 0.95rem; /* NEW: smaller subtitle */
-    margin-top: 0.35rem;
-    margin-bottom: 0;
-}
-
-/* Clean card styling */
-.card {
-    background: white;
-    border: 1px solid var(--border-color);
-    box-shadow: var(--shadow-sm);
-    border-radius: 12px;
-    margin-bottom: 1.5rem;
-    transition: box-shadow 0.2s ease;
-}
-
-.card:hover {
-    box-shadow: var(--shadow-md);
-}
-
-.card-header {
-    background: linear-gradient(135deg, var(--secondary-color), var(--primary-color));
-    color: white;
-    font-weight: 600;
-    border-radius: 12px 12px 0 0 !important;
-    padding: 1rem 1.5rem;
-    border-bottom: none;
-}
-
-/* Simple button styling */
-.btn {
-    font-weight: 600;
-    border-radius: 8px;
-    padding: 0.75rem 1.5rem;
-    transition: all 0.2s ease;
-    border: none;
-}
-
-.btn-primary {
-    background: var(--primary-color);
-    color: white;
-}
-
-.btn-primary:hover {
-    background: var(--primary-dark);
-    transform: translateY(-1px);
-    box-shadow: var(--shadow-md);
-}
-
-.btn-success {
-    background: var(--success-color);
-    color: white;
-}
-
-.btn-success:hover {
-    filter: brightness(0.9);
-    transform: translateY(-1px);
-}
-
-.btn-warning {
-    background: var(--warning-color);
-    color: white;
-}
-
-.btn-warning:hover {
-    filter: brightness(0.9);
-    transform: translateY(-1px);
-}
-
-.btn-outline-warning {
-    background: transparent;
-    border: 2px solid var(--warning-color);
-    color: var(--warning-color);
-}
-
-.btn-outline-warning:hover {
-    background: var(--warning-color);
-    color: white;
-}
-
-/* Export button grouping */
-.btn-group-export {
-    display: flex;
-    gap: 1rem;
-    justify-content: center;
-    flex-wrap: wrap;
-}
-
-/* File upload area */
-.file-upload-area {
-    border: 2px dashed var(--border-color);
-    border-radius: 12px;
-    padding: 2rem;
-    background: var(--background-light);
-    text-align: center;
-    transition: all 0.3s ease;
-}
-
-.file-upload-area:hover {
-    border-color: var(--primary-color);
-    background: white;
-}
-
-/* Fix table header alignment */
-.shiny-table table {
-    width: 100%;
-    table-layout: fixed;
-}
-
-.shiny-table th {
-    text-align: left !important;
-    padding-left: 8px !important;
-}
-
-.shiny-table td {
-    text-align: left !important;
-    padding-left: 8px !important;
-    word-wrap: break-word;
-    overflow-wrap: break-word;
-}
-
-/* Special styling for preview tables in Step 1 - data_frame outputs */
-/* Force left alignment for the entire data_frame container */
-#input_col_preview,
-#target_col_preview {
-    text-align: left !important;
-    display: block !important;
-    margin: 0 !important;
-    padding: 0 !important;
-}
-
-#input_col_preview .shiny-data-frame,
-#target_col_preview .shiny-data-frame {
-    display: block !important;
-    text-align: left !important;
-    margin: 0 !important;
-    padding: 0 !important;
-    width: 100% !important;
-}
-
-#input_col_preview .shiny-data-frame > div,
-#target_col_preview .shiny-data-frame > div {
-    display: block !important;
-    text-align: left !important;
-    margin: 0 auto 0 0 !important; /* This forces left alignment by removing auto centering */
-    padding: 0 !important;
-}
-
-#input_col_preview .shiny-data-frame table,
-#target_col_preview .shiny-data-frame table {
-    width: 100% !important;
-    table-layout: fixed !important;
-    margin: 0 !important;
-    margin-left: 0 !important;
-    margin-right: auto !important;
-    border-collapse: collapse !important;
-}
-
-/* Headers - force left alignment and dark mode support */
-#input_col_preview .shiny-data-frame thead th,
-#target_col_preview .shiny-data-frame thead th {
-    text-align: left !important;
-    padding: 8px !important;
-    vertical-align: middle !important;
-    font-weight: bold !important;
-    color: var(--bs-body-color, #212529) !important;
-    background-color: var(--bs-gray-200, #e9ecef) !important;
-    border-bottom: 2px solid var(--bs-border-color, #dee2e6) !important;
-}
-
-/* First column header (Row) - centered and narrow */
-#input_col_preview .shiny-data-frame thead th:first-child,
-#target_col_preview .shiny-data-frame thead th:first-child {
-    width: 60px !important;
-    min-width: 60px !important;
-    max-width: 60px !important;
-    text-align: center !important;
-}
-
-/* Second column header (Sample Values) - left aligned, takes remaining space */
-#input_col_preview .shiny-data-frame thead th:nth-child(2),
-#target_col_preview .shiny-data-frame thead th:nth-child(2) {
-    text-align: left !important;
-    padding-left: 12px !important;
-    width: auto !important;
-}
-
-/* Data cells - with dark mode support */
-#input_col_preview .shiny-data-frame tbody td,
-#target_col_preview .shiny-data-frame tbody td {
-    text-align: left !important;
-    padding: 8px !important;
-    vertical-align: top !important;
-    word-wrap: break-word !important;
-    overflow-wrap: break-word !important;
-    white-space: normal !important;
-    color: var(--bs-body-color, #212529) !important;
-    background-color: var(--bs-body-bg, white) !important;
-}
-
-/* First column data (Row numbers) - centered */
-#input_col_preview .shiny-data-frame tbody td:first-child,
-#target_col_preview .shiny-data-frame tbody td:first-child {
-    width: 60px !important;
-    text-align: center !important;
-}
-
-/* Second column data - left aligned with wrapping */
-#input_col_preview .shiny-data-frame tbody td:nth-child(2),
-#target_col_preview .shiny-data-frame tbody td:nth-child(2) {
-    text-align: left !important;
-    white-space: normal !important;
-    word-break: break-word !important;
-}
-
-/* When there are 3 columns (cleaning preview) */
-#input_col_preview .shiny-data-frame thead th:nth-child(3),
-#target_col_preview .shiny-data-frame thead th:nth-child(3) {
-    text-align: left !important;
-    width: auto !important;
-}
-
-/* Matching Configuration - Polished Production Styling (theme-friendly) */
-.matching-config-card {
-    background-color: var(--bs-tertiary-bg, var(--bs-body-bg));
-    border-radius: 12px;
-    padding: 1.25rem;
-    box-shadow: 0 2px 8px rgba(0,0,0,0.08);
-    border: 1px solid var(--bs-border-color, rgba(0,0,0,0.05));
-}
-
-.matching-config-card h5 {
-    color: var(--primary-dark);
-    font-weight: 600;
-    letter-spacing: 0.5px;
-}
-
-.matching-config-card h6 {
-    color: var(--primary-color);
-    font-weight: 500;
-}
-
-.matching-config-card .border-end {
-    border-color: var(--border-color) !important;
-}
-
-.matching-config-card .border-start {
-    border-color: var(--border-color) !important;
-}
-
-/* Slider styling for production look - centered */
-/* Ensure slider stays centered and doesn't break on resize */
-.matching-config-card .d-flex.justify-content-center {
-    display: flex !important;
-    justify-content: center !important;
-}
-
-.matching-config-card .mx-auto {
-    margin-left: auto !important;
-    margin-right: auto !important;
-    width: 100% !important;
-}
-
-.matching-config-card .irs-bar {
-    background: var(--primary-color);
-}
-
-.matching-config-card .irs-handle {
-    border: 3px solid var(--primary-color);
-}
-
-/* Centered description text */
-.threshold-description {
-    max-width: 600px;
-    margin: 0 auto;
-    line-height: 1.5;
-    color: var(--text-secondary);
-}
-
-/* Start button hover effect */
-.matching-config-card .btn-primary:hover { transform: translateY(-2px); box-shadow: 0 4px 12px rgba(71, 85, 105, 0.3); }
-
-/* Progress indicator */
-.progress-container {
-    background: white;
-    border-radius: 12px;
-    padding: 2rem;
-    box-shadow: 0 2px 10px rgba(0,0,0,0.08);
-    margin: 1rem 0;
-}
-
-.progress {
-    background-color: #e9ecef;
-    border-radius: 10px;
-    overflow: hidden;
-}
-
-.progress-bar {
-    background: linear-gradient(90deg, var(--primary-color), var(--secondary-color));
-    border-radius: 8px;
-    transition: width 0.5s ease-in-out;
-    font-size: 14px;
-    font-weight: 600;
-    display: flex;
-    align-items: center;
-    justify-content: center;
-    color: white;
-}
-
-.progress-bar-striped {
-    background-image: linear-gradient(45deg, rgba(255,255,255,.15) 25%, transparent 25%, transparent 50%, rgba(255,255,255,.15) 50%, rgba(255,255,255,.15) 75%, transparent 75%, transparent);
-    background-size: 1rem 1rem;
-}
-
-.progress-bar-animated {
-    animation: progress-bar-stripes 1s linear infinite;
-}
-
-@keyframes progress-bar-stripes {
-    from { background-position: 1rem 0; }
-    to { background-position: 0 0; }
-}
-
-/* Status messages */
-.alert-custom {
-    border-radius: 8px;
-    padding: 1rem 1.5rem;
-    margin: 1rem 0;
-    border-left: 4px solid;
-}
-
-.alert-success-custom {
-    background: #f0fdf4;
-    border-color: var(--success-color);
-    color: #166534;
-}
-
-.alert-warning-custom {
-    background: #fffbeb;
-    border-color: var(--warning-color);
-    color: #92400e;
-}
-
-.alert-info-custom {
-    background: #f0f9ff;
-    border-color: var(--primary-color);
-    color: var(--primary-dark);
-}
-
-/* NEW: Enhanced table with proper alignment */
-.table {
-    width: 100%;
-    table-layout: auto;
-    border-collapse: separate;
-    border-spacing: 0;
-    background: var(--surface);
-    color: var(--text-primary);
-}
-
-.table thead {
-    background: var(--surface);
-    color: var(--text-primary);
-    position: sticky;
-    top: 0;
-    z-index: 10;
-    border-bottom: 2px solid var(--primary-color);
-}
-
-.table thead th {
-    padding: 12px;
-    font-weight: 700;
-    text-align: left;
-    white-space: nowrap;
-    border-bottom: 2px solid var(--primary-color);
-}
-
-/* NEW: Numeric column alignment */
-.table th.num,
-.table td.num {
-    text-align: right;
-    font-variant-numeric: tabular-nums;
-}
-
-.table th.text,
-.table td.text {
-    text-align: left;
-}
-
-.table tbody td {
-    padding: 12px;
-    vertical-align: middle;
-    border-bottom: 1px solid var(--border-color);
-}
-
-/* NEW: Compact density mode */
-#results_container.compact .table tbody td {
-    padding: 6px 12px;
-    font-size: 0.875rem;
-    line-height: 1.25;
-}
-
-#results_container.compact .table thead th {
-    padding: 8px 12px;
-}
-
-.table-striped tbody tr:nth-child(odd) {
-    background: rgba(0, 0, 0, 0.02);
-}
-
-.table tbody tr:hover {
-    background: rgba(71, 85, 105, 0.05) !important;
-    cursor: pointer;
-}
-
-/* Footer */
-.footer {
-    margin-top: 3rem;
-    padding: 2rem;
-    border-top: 2px solid var(--border-color);
-    text-align: center;
-    color: #64748b;
-}
-
-/* Animated alerts */
-.alert-animated { animation: fadeIn 0.25s ease-out both; }
-@keyframes fadeIn { from { opacity: 0; transform: translateY(4px);} to { opacity: 1; transform: none; } }
-
-/* NEW: Results container with better scrolling */
-.results-container {
-    height: 520px;
-    overflow: auto;
-    border: 1px solid var(--border-color);
-    border-radius: 12px;
-    padding: 0;
-    background: var(--surface);
-    box-shadow: var(--shadow-sm);
-    position: relative;
-}
-
-.results-container::-webkit-scrollbar {
-    width: 10px;
-    height: 10px;
-}
-
-.results-container::-webkit-scrollbar-track {
-    background: var(--surface);
-    border-radius: 10px;
-}
-
-.results-container::-webkit-scrollbar-thumb {
-    background: var(--primary-color);
-    border-radius: 10px;
-}
-
-.results-container::-webkit-scrollbar-thumb:hover {
-    background: var(--primary-dark);
-}
-
-/* NEW: Make Shiny progress panel wider so text doesn't wrap */
-.shiny-progress-panel { min-width: 520px !important; width: 520px !important; }
-.shiny-progress-panel .progress { height: 0.75rem; }
-.shiny-progress-panel p { white-space: normal; }
-
-/* Loading spinner */
-.spinner-container {
-    display: flex;
-    justify-content: center;
-    align-items: center;
-    padding: 2rem;
-}
-
-.spinner {
-    width: 40px;
-    height: 40px;
-    border: 3px solid var(--border-color);
-    border-top-color: var(--primary-color);
-    border-radius: 50%;
-    animation: spin 1s linear infinite;
-}
-
-@keyframes spin {
-    to { transform: rotate(360deg); }
-}
-
-/* Score bar visualization */
-.scorebar {
-    font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, monospace;
-    letter-spacing: 0.5px;
-    white-space: nowrap;
-    color: var(--secondary-color);
-}
-
-/* NEW: Status badges */
-.status-badge {
-    display: inline-block;
-    font-weight: 600;
-    font-size: 0.75rem;
-    padding: 0.25rem 0.75rem;
-    border-radius: 9999px;
-    text-transform: uppercase;
-    letter-spacing: 0.025em;
-}
-
-.status-ok {
-    background: rgba(16, 185, 129, 0.1);
-    color: var(--success-color);
-    border: 1px solid var(--success-color);
-}
-
-.status-warn {
-    background: rgba(245, 158, 11, 0.1);
-    color: var(--warning-color);
-    border: 1px solid var(--warning-color);
-}
-
-/* Method chips */
-.method-chip {
-    display: inline-block;
-    background: var(--secondary-color);
-    color: white;
-    padding: 0.25rem 0.75rem;
-    border-radius: 16px;
-    font-size: 0.875rem;
-    font-weight: 500;
-    margin: 0.25rem;
-}
-
-/* NEW: Nav tabs styling */
-.nav-tabs {
-    border-bottom: 2px solid var(--border-color);
-    margin-bottom: 1.5rem;
-}
-
-.nav-tabs .nav-link {
-    color: var(--primary-color);
-    border: none;
-    padding: 0.75rem 1.5rem;
-    font-weight: 500;
-    transition: all 0.3s ease;
-    position: relative;
-}
-
-.nav-tabs .nav-link:hover {
-    color: var(--primary-color);
-    background: transparent;
-}
-
-.nav-tabs .nav-link.active {
-    color: var(--primary-dark);
-    background: transparent;
-    border: none;
-    font-weight: 600;
-}
-
-.nav-tabs .nav-link.active::after {
-    content: '';
-    position: absolute;
-    bottom: -2px;
-    left: 0;
-    right: 0;
-    height: 2px;
-    background: var(--primary-color);
-}
-
-/* NEW: Tooltip styles */
-.tooltip {
-    font-size: 0.875rem;
-}
-
-/* NEW: Mobile responsive improvements */
-@media (max-width: 768px) {
-    .container-fluid {
-        padding: 12px;
-    }
-    
-    .app-header {
-        padding: 2rem 1rem;
-        border-radius: 12px;
-    }
-    
-    .card {
-        margin-bottom: 1rem;
-        border-radius: 12px;
-    }
-    
-    .btn {
-        padding: 0.625rem 1.25rem;
-        font-size: 0.875rem;
-    }
-    .btn-group-export { justify-content: center; }
-    
-    .btn-group-export {
-        flex-direction: column;
-    }
-    
-    .results-container {
-        height: 400px;
-    }
-    
-    .nav-tabs .nav-link {
-        padding: 0.5rem 0.75rem;
-        font-size: 0.875rem;
-    }
-}
+# Minimal custom CSS to preserve app behaviors while letting themes show
+# Active stylesheet lives in assets/app.css; tools/minify_css.py builds assets/app.min.css
+ASSETS_DIR = Path(__file__).resolve().parent / "assets"
+CSS_DEBUG = os.environ.get("CSS_DEBUG", "false").lower() in {"1", "true", "yes", "on"}
+# HIDE_SPLASH_SCREEN: set to "true"/"1"/"yes" to skip the welcome splash (shown by default)
+HIDE_SPLASH_SCREEN = os.environ.get("HIDE_SPLASH_SCREEN", "").lower() in {"true", "1", "yes"}
+
+def _css_asset(name: str) -> Path:
+    """assets/<name>.min.css, or the readable source when CSS_DEBUG is set."""
+    path = ASSETS_DIR / (f"{name}.css" if CSS_DEBUG else f"{name}.min.css")
+    return path if path.exists() else ASSETS_DIR / f"{name}.css"
+
+@lru_cache(maxsize=None)
+def read_css(name: str) -> str:
+    """Stylesheet text, read from disk once per process."""
+    return _css_asset(name).read_text(encoding="utf-8")
+
+@lru_cache(maxsize=None)
+def css_href(name: str) -> str:
+    """/static URL with a content-hash query so browsers can cache it indefinitely."""
+    path = _css_asset(name)
+    return f"static/{path.name}?v={hashlib.blake2b(path.read_bytes(), digest_size=8).hexdigest()}"
+
+def stylesheet_head():
+    """Head tags: inline critical CSS, then preload the main sheet and apply it on load.
+
+    Above-the-fold rules are inlined; the rest of the stylesheet loads without
+    blocking render.
+    """
+    app_href = css_href("app")
+    return ui.head_content(
+        ui.tags.style(read_css("critical")),
+        ui.tags.link(rel="preload", href=app_href, as_="style", onload="this.onload=null;this.rel='stylesheet'"),
+        ui.tags.noscript(ui.tags.link(rel="stylesheet", href=app_href)),
+    )
 
-@media (max-width: 480px) {
-    .app-header h1 {
-        font-size: 1.75rem;
-    }
-    
-    .app-header p {
-        font-size: 0.875rem;
-    }
-    
-    .table {
-        font-size: 0.75rem;
-    }
-    
-    .table thead th,
-    .table tbody td {
-        padding: 8px 6px;
-    }
-}
-
-/* Simple transitions */
-.fade-in {
-    animation: fadeIn 0.2s ease;
-}
-
-@keyframes fadeIn {
-    from { opacity: 0; }
-    to { opacity: 1; }
-}
-
-/* NEW: File input styling */
-.file-upload-area {
-    border: 2px dashed var(--border-color);
-    border-radius: 12px;
-    padding: 2rem;
-    background: var(--surface);
-    text-align: center;
-    transition: all 0.3s ease;
-    cursor: pointer;
-}
-
-.file-upload-area:hover {
-    border-color: var(--primary-color);
-    background: var(--background);
-    box-shadow: var(--shadow-sm);
-}
-
-/* Alert animations */
-.alert-animated {
-    animation: fadeIn 0.2s ease;
-}
-
-/* Fix Shiny's file input progress bar - center text vertically */
-.shiny-input-container .progress {
-    min-height: 1.5rem !important;
-    height: 1.5rem !important;
-    display: flex !important;
-    align-items: center !important;
-}
-
-.shiny-input-container .progress-bar {
-    min-height: 1.5rem !important;
-    height: 1.5rem !important;
-    line-height: 1 !important;  /* Reset line-height */
-    font-size: 0.875rem;
-    display: flex !important;
-    align-items: center !important;
-    justify-content: center !important;
-    padding: 0 0.5rem;
-}
-
-/* Make the 'Loaded X rows' status alerts thinner */
-#input_file_status .alert,
-#target_file_status .alert {
-    padding: 0.4rem 0.75rem !important;
-    margin-bottom: 0.25rem;
-    font-size: 0.875rem;
-}
-
-#input_file_status p,
-#target_file_status p {
-    margin: 0;
-    line-height: 1.2;
-}
-"""
+class ImmutableStaticMiddleware:
+    """ASGI middleware marking versioned /static/ responses as immutable for a year."""
 
-# Minimal custom CSS to preserve app behaviors while letting themes show
-custom_css_min = """
-/* Fix Shiny's file input progress bar - thinner with centered text */
-.sidebar { min-height: 100vh; }
-
-.page-sidebar .sidebar { min-height: 100vh; }
-
-/* Small, theme-friendly footer shown on all pages */
-.footer {
-    margin-top: 1rem !important;
-    padding: 0.75rem 1rem !important;
-    border-top: 1px solid var(--bs-border-color, #dee2e6) !important;
-    text-align: center !important;
-    color: var(--bs-secondary-color, inherit) !important;
-    font-size: 0.9rem !important;
-}
-
-.shiny-input-container .progress {
-    min-height: 1.4rem !important;
-    height: 1.4rem !important;
-    margin-bottom: 0 !important;  /* Remove bottom margin */
-}
-
-/* Let Shiny's default animation work - only adjust height and text position */
-.shiny-input-container .progress-bar {
-    min-height: 1.4rem !important;
-    height: 1.4rem !important;
-    line-height: 1.4rem !important;
-    font-size: 0.8rem !important;
-    padding-top: 0.1rem !important;  /* Small padding to center text */
-    /* Allow Shiny's default transition animation */
-    transition: width 0.6s ease !important;
-}
-
-/* Make the 'Loaded X rows' status alerts much thinner and even closer to upload bar */
-#input_file_status .alert,
-#target_file_status .alert {
-    padding: 0.25rem 0.5rem !important;
-    margin-bottom: 0.5rem !important;
-    margin-top: -0.75rem !important;  /* Even more negative margin to bring closer */
-    font-size: 0.85rem !important;
-    line-height: 1.1 !important;
-    min-height: auto !important;
-    position: relative !important;
-    top: -0.25rem !important;  /* Additional upward shift */
-}
-
-/* Also adjust the container divs to reduce spacing */
-#input_status,
-#target_status {
-    margin-top: -0.25rem !important;
-    margin-bottom: 0 !important;
-    padding-top: 0 !important;
-}
-
-#input_file_status p,
-#target_file_status p {
-    margin: 0 !important;
-    padding: 0 !important;
-    line-height: 1.1 !important;
-}
-
-/* Results container: bounded height and scrolling */
-.results-container {
-    height: 520px;
-    overflow: auto;
-}
-
-/* Compact density mode for results table */
-#results_container.compact table tbody td {
-    padding: 6px 12px;
-    font-size: 0.875rem;
-    line-height: 1.25;
-}
-#results_container.compact table thead th {
-    padding: 8px 12px;
-}
-
-/* Numeric/text alignment used by JS alignment helper */
-.table th.num, .table td.num { text-align: right; font-variant-numeric: tabular-nums; }
-.table th.text, .table td.text { text-align: left; }
-
-/* Score bar visualization */
-.scorebar {
-    font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, monospace;
-    white-space: nowrap;
-    letter-spacing: 0.5px;
-}
-
-/* Simple spinner for long-running tasks */
-.spinner-container { display: flex; justify-content: center; align-items: center; padding: 2rem; }
-.spinner { width: 40px; height: 40px; border: 3px solid rgba(0,0,0,0.1); border-top-color: currentColor; border-radius: 50%; animation: spin 1s linear infinite; }
-@keyframes spin { to { transform: rotate(360deg); } }
-
-/* Export button group layout */
-.btn-group-export { display: flex; gap: 1rem; justify-content: center; flex-wrap: wrap; }
-
-/* Optional small fade-in animation class used by notifications */
-.alert-animated { animation: fadeIn 0.25s ease-out both; }
-@keyframes fadeIn { from { opacity: 0; transform: translateY(4px);} to { opacity: 1; transform: none; } }
-
-/* Shiny progress panel: polished and theme-adaptive */
-.shiny-progress-panel {
-    width: 420px !important;
-    min-width: 360px !important;
-    max-width: 90vw;
-    padding: 1.25rem;
-    border-radius: 0.5rem;
-    background-color: var(--bs-body-bg, white) !important;
-    border: 1px solid var(--bs-border-color, rgba(0,0,0,0.125)) !important;
-    box-shadow: 0 0.5rem 1rem rgba(0,0,0,0.15), 0 0.125rem 0.25rem rgba(0,0,0,0.075);
-    animation: slide-in-bottom 0.3s cubic-bezier(0.25, 0.46, 0.45, 0.94) both;
-    /* Position at bottom right with proper spacing */
-    position: fixed !important;
-    right: 20px !important;
-    bottom: 20px !important;
-    left: auto !important;
-    top: auto !important;
-    transform: none !important;
-    z-index: 9999 !important;
-}
-.shiny-progress-panel .progress-text,
-.shiny-progress-panel p { 
-    color: var(--bs-body-color, #212529) !important;
-    font-size: 0.875rem !important;
-    font-weight: 500 !important;
-    margin-bottom: 0.75rem !important;
-    line-height: 1.4 !important;
-    display: block !important;
-    text-align: left !important;
-}
-.shiny-progress-panel .progress { 
-    height: 1.25rem !important;
-    background-color: var(--bs-gray-200, #e9ecef) !important;
-    border-radius: 0.375rem !important;
-    overflow: hidden !important;
-    margin-bottom: 0.5rem !important;
-    box-shadow: inset 0 1px 2px rgba(0,0,0,0.075) !important;
-}
-.shiny-progress-panel .progress-bar { 
-    background: linear-gradient(90deg, var(--bs-primary, #0d6efd), var(--bs-info, #0dcaf0)) !important;
-    transition: width 0.6s cubic-bezier(0.25, 0.46, 0.45, 0.94) !important;
-    font-size: 0.75rem !important;
-    font-weight: 600 !important;
-    color: white !important;
-    display: flex !important;
-    align-items: center !important;
-    justify-content: center !important;
-    position: relative !important;
-    overflow: hidden !important;
-}
-.shiny-progress-panel .progress-bar::after {
-    content: '';
-    position: absolute;
-    top: 0;
-    left: 0;
-    bottom: 0;
-    right: 0;
-    background: linear-gradient(
-        90deg,
-        transparent,
-        rgba(255, 255, 255, 0.2),
-        transparent
-    );
-    animation: shimmer 2s infinite;
-}
-@keyframes shimmer {
-    0% { transform: translateX(-100%); }
-    100% { transform: translateX(100%); }
-}
-.shiny-progress-panel .progress-bar-animated { 
-    background-image: linear-gradient(
-        45deg,
-        rgba(255,255,255,.15) 25%,
-        transparent 25%,
-        transparent 50%,
-        rgba(255,255,255,.15) 50%,
-        rgba(255,255,255,.15) 75%,
-        transparent 75%,
-        transparent
-    ) !important;
-    background-size: 1rem 1rem !important;
-    animation: progress-bar-stripes 1s linear infinite !important;
-}
-@keyframes slide-in-bottom {
-    0% {
-        transform: translateY(50px);
-        opacity: 0;
-    }
-    100% {
-        transform: translateY(0);
-        opacity: 1;
-    }
-}
-@keyframes progress-bar-stripes { 
-    from { background-position: 1rem 0; } 
-    to { background-position: 0 0; } 
-}
-
-/* Enhanced navbar tab styling */
-.navbar-nav .nav-item .nav-link {
-    border-radius: 0.375rem;
-    padding: 0.5rem 1rem !important;
-    margin: 0 0.25rem;
-    transition: all 0.2s ease;
-    position: relative;
-    color: var(--bs-nav-link-color, #495057) !important;
-}
-
-.navbar-nav .nav-item .nav-link.active {
-    background-color: var(--bs-primary, #0d6efd) !important;
-    color: white !important;
-    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-}
-
-.navbar-nav .nav-item .nav-link:hover:not(.active) {
-    background-color: var(--bs-gray-200, #e9ecef);
-    color: var(--bs-body-color, #212529) !important;
-}
-
-/* Remove default underline */
-.navbar-nav .nav-item .nav-link.active::after {
-    display: none !important;
-}
-
-/* Matching configuration panel - theme friendly */
-.config-card {
-    background-color: var(--bs-tertiary-bg, var(--bs-body-bg)) !important;
-    border: 1px solid var(--bs-border-color, #dee2e6) !important;
-    border-radius: .5rem !important;
-    padding: 1rem !important;
-}
-/* threshold-badge removed (using slider only) */
-.config-row .btn { width: 100%; }
-
-/* Step 1 preview tables: keep left-aligned and full width at all sizes */
-#input_col_preview, #target_col_preview {
-    text-align: left !important;
-    display: block !important;
-    margin: 0 !important;
-    padding: 0 !important;
-    width: 100% !important;
-}
-#input_preview_wrap, #target_preview_wrap {
-    display: flex !important;
-    width: 100% !important;
-}
-#input_preview_wrap > *, #target_preview_wrap > * {
-    flex: 1 1 auto !important;
-    width: 100% !important;
-}
-#input_col_preview .shiny-data-frame, #target_col_preview .shiny-data-frame {
-    display: block !important;
-    text-align: left !important;
-    margin: 0 !important;
-    padding: 0 !important;
-    width: 100% !important;
-}
-#input_col_preview .gridjs-container, #target_col_preview .gridjs-container,
-#input_col_preview .gridjs-wrapper, #target_col_preview .gridjs-wrapper {
-    width: 100% !important;
-    max-width: none !important;
-    margin-left: 0 !important;
-    margin-right: 0 !important;
-}
-/* Improve text density so more characters fit on two lines */
-#input_col_preview .gridjs-table td.gridjs-td,
-#target_col_preview .gridjs-table td.gridjs-td {
-    padding-left: 6px !important;
-    padding-right: 6px !important;
-    font-size: 0.95rem !important;
-    line-height: 1.2 !important;
-    white-space: normal !important;
-    word-break: break-word !important;
-    overflow-wrap: anywhere !important;
-    hyphens: auto !important;
-}
-#input_col_preview .gridjs-table th.gridjs-th,
-#target_col_preview .gridjs-table th.gridjs-th {
-    padding-left: 8px !important;
-    padding-right: 8px !important;
-}
-#input_col_preview .shiny-data-frame > div, #target_col_preview .shiny-data-frame > div {
-    display: block !important;
-    text-align: left !important;
-    margin: 0 auto 0 0 !important; /* prevent auto-centering */
-    padding: 0 !important;
-    width: 100% !important;
-    max-width: none !important;
-}
-#input_col_preview .shiny-data-frame table, #target_col_preview .shiny-data-frame table,
-#input_col_preview .gridjs-table, #target_col_preview .gridjs-table {
-    width: 100% !important;
-    /* Allow content to determine width so text columns expand and 'Row' stays narrow */
-    table-layout: auto !important;
-    margin: 0 !important;
-    margin-left: 0 !important;
-    margin-right: auto !important;
-    border-collapse: collapse !important;
-}
-#input_preview_wrap .table-responsive, #target_preview_wrap .table-responsive {
-    width: 100% !important;
-    margin: 0 !important;
-}
-/* Make any Shiny fill wrappers align to the left and fill width */
-#input_col_preview .html-fill-container, #target_col_preview .html-fill-container,
-#input_col_preview .html-fill-item, #target_col_preview .html-fill-item {
-    display: block !important;
-    justify-content: flex-start !important;
-    align-items: stretch !important;
-    width: 100% !important;
-    max-width: none !important;
-    margin-left: 0 !important;
-    margin-right: 0 !important;
-}
-/* Catch-all for inline auto-centering styles */
-#input_col_preview div[style*="margin: 0 auto"],
-#target_col_preview div[style*="margin: 0 auto"],
-#input_col_preview div[style*="margin-left: auto"],
-#input_col_preview div[style*="margin-right: auto"],
-#target_col_preview div[style*="margin-left: auto"],
-#target_col_preview div[style*="margin-right: auto"] {
-    margin-left: 0 !important;
-    margin-right: 0 !important;
-    width: 100% !important;
-    max-width: none !important;
-}
-/* Shiny fill layout elements sometimes center children with auto margins */
-#input_col_preview .html-fill-item, #target_col_preview .html-fill-item,
-#input_col_preview .html-fill-container, #target_col_preview .html-fill-container {
-    margin-left: 0 !important;
-    margin-right: 0 !important;
-    width: 100% !important;
-    max-width: none !important;
-}
-/* In case an inner wrapper uses inline style widths, let it stretch */
-#input_col_preview div[style*="margin-left: auto"],
-#input_col_preview div[style*="margin-right: auto"],
-#target_col_preview div[style*="margin-left: auto"],
-#target_col_preview div[style*="margin-right: auto"] {
-    margin-left: 0 !important;
-    margin-right: 0 !important;
-    width: 100% !important;
-}
-/* Header/data alignment for consistency */
-#input_col_preview .shiny-data-frame thead th,
-#target_col_preview .shiny-data-frame thead th { text-align: left !important; }
-#input_col_preview .shiny-data-frame thead th:first-child,
-#target_col_preview .shiny-data-frame thead th:first-child { width: 36px !important; text-align: center !important; }
-#input_col_preview .shiny-data-frame tbody td,
-#target_col_preview .shiny-data-frame tbody td { text-align: left !important; vertical-align: top !important; }
-#input_col_preview .shiny-data-frame tbody td:first-child,
-#target_col_preview .shiny-data-frame tbody td:first-child { width: 36px !important; text-align: center !important; white-space: nowrap !important; }
-
-/* Also constrain first column via colgroup to override library sizing */
-#input_col_preview .shiny-data-frame colgroup col:first-child,
-#target_col_preview .shiny-data-frame colgroup col:first-child {
-    width: 36px !important;
-    min-width: 36px !important;
-    max-width: 36px !important;
-}
-/* Tighten padding on the small first column */
-#input_col_preview .shiny-data-frame thead th:first-child,
-#input_col_preview .shiny-data-frame tbody td:first-child,
-#target_col_preview .shiny-data-frame thead th:first-child,
-#target_col_preview .shiny-data-frame tbody td:first-child {
-    padding-left: 6px !important;
-    padding-right: 6px !important;
-}
-
-/* Grid.js (Shiny DataGrid) often enforces a min column width (~120px).
-   Explicitly override only for the first column within these two previews. */
-#input_col_preview .gridjs-table thead th:first-child,
-#input_col_preview .gridjs-table tbody td:first-child,
-#input_col_preview .gridjs-header .gridjs-th:first-child,
-#input_col_preview .gridjs-body .gridjs-td:first-child,
-#target_col_preview .gridjs-table thead th:first-child,
-#target_col_preview .gridjs-table tbody td:first-child,
-#target_col_preview .gridjs-header .gridjs-th:first-child,
-#target_col_preview .gridjs-body .gridjs-td:first-child {
-    width: 36px !important;
-    min-width: 36px !important;
-    max-width: 40px !important;
-    text-align: center !important;
-    white-space: nowrap !important;
-}
-
-/* Make sure the table can use the freed space for text columns */
-#input_col_preview .gridjs-table,
-#target_col_preview .gridjs-table { width: 100% !important; }
-
-/* Center overlay progress (theme-friendly) */
-.center-progress-backdrop { position: fixed; inset: 0; background: rgba(0,0,0,0.25); display: flex; align-items: center; justify-content: center; z-index: 2000; }
-.center-progress-panel { width: 720px; max-width: 90vw; }
-/* App title size */
-.app-title { font-size: 2rem; font-weight: 700; margin: 0; }
-
-/* Highlight NO MATCH rows with light red background */
-.no-match-row {
-    background-color: rgba(220, 53, 69, 0.08) !important;
-}
-.no-match-row:hover {
-    background-color: rgba(220, 53, 69, 0.15) !important;
-}
-"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not scope["path"].startswith("/static/")
+            or b"v=" not in scope.get("query_string", b"")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cache_header(message):
+            if message["type"] == "http.response.start":
+                headers = [(k, v) for k, v in message.get("headers", []) if k.lower() != b"cache-control"]
+                headers.append((b"cache-control", b"public, max-age=31536000, immutable"))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cache_header)
 
 # ============================================================================
 # EMBEDDING CONFIGURATION
@@ -1205,23 +147,99 @@ custom_css_min = """
 
 # Model and API settings
 DEEPINFRA_MODEL = "thenlper/gte-large"
+DEEPINFRA_MAX_BATCH = 1024  # provider limit on inputs per embeddings request
 # Concurrency settings
 MAX_CONCURRENCY = int(os.environ.get("EMBEDDING_CONCURRENCY", "100"))
-EMBED_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "200"))
+EMBED_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "200"))  # starting size when adaptive
+# Grow/shrink the API batch size toward a target per-request latency window (seconds)
+EMBED_BATCH_ADAPTIVE = os.environ.get("EMBEDDING_BATCH_ADAPTIVE", "true").lower() in {"1", "true", "yes", "on"}
+EMBED_BATCH_MIN = 32
+EMBED_BATCH_TARGET_LOW_SECS = float(os.environ.get("EMBEDDING_BATCH_TARGET_LOW_SECS", "3"))
+EMBED_BATCH_TARGET_HIGH_SECS = float(os.environ.get("EMBEDDING_BATCH_TARGET_HIGH_SECS", "10"))
 USE_PRIORITY_TIER = os.environ.get("DEEPINFRA_PRIORITY", "false").lower() in {"1", "true", "yes", "on"}
-USE_ASYNC = os.environ.get("EMBEDDING_ASYNC", "true").lower() in {"1", "true", "yes", "on"}
+# Storage/scoring precision: "f32" (high precision, default), "f16" (half RAM, upcast per tile) or "i8" (quantized, 4x less bandwidth)
+_EMBED_DTYPE_ALIASES = {"float32": "f32", "float16": "f16", "half": "f16", "int8": "i8"}
+EMBED_DTYPE = os.environ.get("EMBED_DTYPE", "f32").lower()
+EMBED_DTYPE = _EMBED_DTYPE_ALIASES.get(EMBED_DTYPE, EMBED_DTYPE)
+if EMBED_DTYPE not in {"f32", "f16", "i8"}:
+    print(f"[config] unknown EMBED_DTYPE={EMBED_DTYPE!r}; using f32")
+    EMBED_DTYPE = "f32"
+
+# Nearest-neighbour index for large target corpora (needs faiss): "flat" (exact), "hnsw" (approximate),
+# or "auto" (flat, switching to HNSW from ANN_HNSW_MIN_CORPUS targets)
+ANN_INDEX = os.environ.get("ANN_INDEX", "auto").lower()
+ANN_MIN_CORPUS = int(os.environ.get("ANN_MIN_CORPUS", "5000"))
+ANN_HNSW_MIN_CORPUS = int(os.environ.get("ANN_HNSW_MIN_CORPUS", "100000"))
+
+# Fuzzy prefilter: rerank only the top-M token_set_ratio candidates per input (0 = score every target).
+# Approximate when enabled: the true best embedding match can fall outside the shortlist
+FUZZY_PREFILTER_TOP_M = int(os.environ.get("FUZZY_PREFILTER_TOP_M", "0"))
+
+# PCA shortlist for large float32 corpora: candidates are found in EMBED_PCA_DIM dims, then the
+# top EMBED_PCA_RERANK are rescored at full width (0 = off)
+EMBED_PCA_DIM = int(os.environ.get("EMBED_PCA_DIM", "0"))
+EMBED_PCA_MIN_CORPUS = int(os.environ.get("EMBED_PCA_MIN_CORPUS", "20000"))
+EMBED_PCA_RERANK = max(1, int(os.environ.get("EMBED_PCA_RERANK", "8")))
 
 # Fallback behavior
-API_EMBED_TIMEOUT_SECS = int(os.environ.get("API_EMBED_TIMEOUT_SECS", "45"))  # overall call timeout
+API_EMBED_TIMEOUT_SECS = int(os.environ.get("API_EMBED_TIMEOUT_SECS", "45"))  # timeout per wave of MAX_CONCURRENCY requests
+API_ATTEMPT_TIMEOUT_SECS = float(os.environ.get("API_ATTEMPT_TIMEOUT_SECS", "15"))  # per-request timeout within retries
 API_MAX_FAILURES = int(os.environ.get("API_EMBED_MAX_FAILURES", "3"))         # consecutive failures before CPU fallback
 MODEL_FALLBACK_MODE = os.environ.get("MODEL_FALLBACK_MODE", "auto").lower()
 # Values: "auto" (try API then fallback), "api" (force API only), "local" (force CPU), "off" (no fallback)
 
+# Local model backend: "auto" (ONNX Runtime on CPU-only hosts when installed, else PyTorch), "onnx" or "torch"
+LOCAL_MODEL_BACKEND = os.environ.get("LOCAL_MODEL_BACKEND", "auto").lower()
+LOCAL_ONNX_FILE = os.environ.get("LOCAL_ONNX_FILE", "onnx/model_qint8_avx512_vnni.onnx")
+# Model forward-pass batch; unset uses a tuned size from disk, else 256 on a GPU and 32 on CPU
+LOCAL_ENCODE_BATCH_SIZE = int(os.environ.get("LOCAL_ENCODE_BATCH_SIZE", "0"))
+LOCAL_ENCODE_CHUNK = 2048  # texts per encode() call
+LOCAL_MAX_SEQ_LENGTH = int(os.environ.get("LOCAL_MAX_SEQ_LENGTH", "128"))  # tokens; food names run 5-20
+
+# Persistent embedding cache (SQLite); set EMBEDDING_CACHE=off to disable
+EMBEDDING_CACHE_ENABLED = os.environ.get("EMBEDDING_CACHE", "on").lower() in {"1", "true", "yes", "on"}
+EMBEDDING_CACHE_PATH = os.environ.get(
+    "EMBEDDING_CACHE_PATH",
+    str(Path.home() / ".cache" / "food-mapper" / "embeddings.sqlite3"),
+)
+# Opt-in local encoder batch auto-tune: measured once per device/model/backend, then read back from disk.
+# The measurement runs inside the first large fallback run and slows it; set LOCAL_BATCH_AUTOTUNE=on to enable
+LOCAL_BATCH_AUTOTUNE = os.environ.get("LOCAL_BATCH_AUTOTUNE", "off").lower() in {"1", "true", "yes", "on"}
+LOCAL_BATCH_TUNE_PATH = Path(EMBEDDING_CACHE_PATH).parent / "batch_size.json"
+LOCAL_BATCH_CANDIDATES = (16, 32, 64, 128, 256)  # 256 is only tried on GPUs
+LOCAL_BATCH_TUNE_ROWS = 512
+# Locally quantized ONNX export, built once when the hub repo has no file matching LOCAL_ONNX_FILE
+LOCAL_ONNX_EXPORT_DIR = Path(os.environ.get(
+    "LOCAL_ONNX_EXPORT_DIR",
+    str(Path(EMBEDDING_CACHE_PATH).parent / "onnx" / DEEPINFRA_MODEL.replace("/", "--")),
+))
+# Whole-corpus target matrices saved as .npy, keyed by a hash of the target list; set TARGET_EMBED_CACHE=off to disable
+TARGET_EMBED_CACHE_ENABLED = os.environ.get("TARGET_EMBED_CACHE", "on").lower() in {"1", "true", "yes", "on"}
+TARGET_EMBED_CACHE_DIR = Path(os.environ.get(
+    "TARGET_EMBED_CACHE_DIR",
+    str(Path(EMBEDDING_CACHE_PATH).parent / "targets" / DEEPINFRA_MODEL.replace("/", "--")),
+))
+# Prepared target matrices (scoring dtype + ANN index) kept in memory for re-runs on the same list
+PREPARED_TARGETS_MAX = int(os.environ.get("PREPARED_TARGETS_MAX", "2"))
+
+# Opt-in: start embedding the chosen target column in the background before Run is clicked (API only).
+# This spends API calls on every target column selected, including ones never run; set TARGET_PREWARM=on to enable
+TARGET_PREWARM_ENABLED = os.environ.get("TARGET_PREWARM", "off").lower() in {"1", "true", "yes", "on"}
+TARGET_PREWARM_DELAY_SECS = 1.5  # let column/cleaning choices settle first
+
 # Runtime state
 FALLBACK_ACTIVE: bool = False
 _API_FAILURES: int = 0
 _LOCAL_ST_MODEL: Optional["SentenceTransformer"] = None  # lazy-loaded cache
 
+# Shared worker pool for blocking work (CSV parsing, SQLite, local model inference)
+_BLOCKING_POOL = ThreadPoolExecutor(max_workers=min(32, os.cpu_count() or 4), thread_name_prefix="food-mapper")
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call on the bounded module-level pool without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_BLOCKING_POOL, partial(func, *args, **kwargs))
+
 def get_api_key():
     """Get API key from environment variable or HuggingFace secret"""
     # Try HuggingFace secret first
@@ -1231,66 +249,126 @@ def get_api_key():
         api_key = os.environ.get("DEEPINFRA_TOKEN")
     return api_key
 
-# Client caching for connection pooling
-_CLIENT_CACHE: Dict[str, OpenAI] = {}
-_ASYNC_CLIENT_CACHE: Dict[str, AsyncOpenAI] = {}
-
-def get_openai_client(api_key: str) -> OpenAI:
-    """Create or retrieve cached OpenAI client configured for DeepInfra"""
-    if api_key in _CLIENT_CACHE:
-        return _CLIENT_CACHE[api_key]
-    client = OpenAI(
-        api_key=api_key,
-        base_url="https://api.deepinfra.com/v1/openai"
-    )
-    _CLIENT_CACHE[api_key] = client
-    return client
+# Async clients hold connection pools bound to the loop they were created on, so they are cached per loop
+_ASYNC_CLIENT_CACHE: Dict[Tuple[str, int], Tuple[asyncio.AbstractEventLoop, AsyncOpenAI]] = {}
+_CLIENT_HEADERS = {"User-Agent": "food-mapper"}
+
+# Shared HTTP settings; HTTP/2 multiplexes concurrent requests over a few connections when 'h2'
+# is installed, so the pool stays small there. HTTP/1.1 needs one connection per in-flight request.
+HTTP2_MAX_CONNECTIONS = 8
+_POOL_SIZE = HTTP2_MAX_CONNECTIONS if HTTP2_AVAILABLE else max(10, MAX_CONCURRENCY)
+_HTTP_LIMITS = httpx.Limits(
+    max_connections=_POOL_SIZE,
+    max_keepalive_connections=_POOL_SIZE,
+    keepalive_expiry=60.0,
+)
+_HTTP_TIMEOUT = httpx.Timeout(60.0, connect=20.0, read=60.0, write=60.0)
+if not HTTP2_AVAILABLE:
+    print("[async] HTTP/2 not available (h2 not installed). Falling back to HTTP/1.1")
 
 def get_async_openai_client(api_key: str) -> AsyncOpenAI:
-    """Create or retrieve cached AsyncOpenAI client configured for DeepInfra"""
-    if api_key in _ASYNC_CLIENT_CACHE:
-        return _ASYNC_CLIENT_CACHE[api_key]
-    # Configure HTTP client for higher concurrency
-    limits = httpx.Limits(
-        max_connections=max(10, MAX_CONCURRENCY),
-        max_keepalive_connections=max(10, MAX_CONCURRENCY),
-    )
-    timeout = httpx.Timeout(60.0, connect=20.0, read=60.0, write=60.0)
-    # Enable HTTP/2 only if the 'h2' package is available
-    http_client = httpx.AsyncClient(limits=limits, timeout=timeout, http2=HTTP2_AVAILABLE)
-    if not HTTP2_AVAILABLE:
-        print("[async] HTTP/2 not available (h2 not installed). Falling back to HTTP/1.1")
+    """Create or retrieve the AsyncOpenAI client for DeepInfra on the running event loop"""
+    loop = asyncio.get_running_loop()
+    key = (api_key, id(loop))
+    cached = _ASYNC_CLIENT_CACHE.get(key)
+    if cached is not None and cached[0] is loop:
+        return cached[1]
+    # Drop clients whose loop has been closed: their pools cannot be awaited on any other
+    # loop, so releasing the last reference is what lets their sockets be collected
+    for stale_key, (stale_loop, _) in list(_ASYNC_CLIENT_CACHE.items()):
+        if stale_loop.is_closed():
+            del _ASYNC_CLIENT_CACHE[stale_key]
+            print("[async] dropped API client bound to a closed event loop")
+    http_client = httpx.AsyncClient(limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT, http2=HTTP2_AVAILABLE)
     client = AsyncOpenAI(
         api_key=api_key,
         base_url="https://api.deepinfra.com/v1/openai",
         http_client=http_client,
+        default_headers=_CLIENT_HEADERS,
     )
-    _ASYNC_CLIENT_CACHE[api_key] = client
+    _ASYNC_CLIENT_CACHE[key] = (loop, client)
     return client
 
-def compute_embeddings_deepinfra(texts: List[str], api_key: str) -> np.ndarray:
-    """Compute embeddings using DeepInfra API via OpenAI client"""
-    client = get_openai_client(api_key)
+@atexit.register
+def _close_http_clients() -> None:
+    """Drain pooled connections on interpreter shutdown, each on the loop that owns it.
 
-    try:
-        extra_body = {"normalize": True}
-        if USE_PRIORITY_TIER:
-            extra_body["service_tier"] = "priority"
+    Clients on a closed loop cannot be awaited anywhere and are only dropped.
+    """
+    for loop, client in _ASYNC_CLIENT_CACHE.values():
+        if loop.is_closed():
+            continue
+        try:
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.close(), loop).result(timeout=5)
+            else:
+                loop.run_until_complete(client.close())
+        except Exception as e:
+            print(f"[async] API client close failed: {type(e).__name__}: {e}")
+    _ASYNC_CLIENT_CACHE.clear()
+
+class _BatchController:
+    """Adapts the embeddings request size to measured API latency.
+
+    Doubles the size while full-size requests finish under the low target,
+    halves it when one takes longer than the high target. Samples from
+    partial or stale (smaller) batches are ignored, so a burst of concurrent
+    completions moves the size at most one step.
+    """
 
-        # Create embeddings using OpenAI client
-        response = client.embeddings.create(
-            model=DEEPINFRA_MODEL,
-            input=texts,
-            encoding_format="float",
-            extra_body=extra_body,
-        ),
+    def __init__(self, size: int, min_size: int, max_size: int, low: float, high: float):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.size = max(min_size, min(size, max_size))
+        self.low = low
+        self.high = high
 
-        # Extract embeddings from response (already normalized if normalize=True)
-        embeddings = np.array([data.embedding for data in response.data], dtype=np.float32)
-        return embeddings
+    def suggest(self) -> int:
+        return self.size
 
-    except Exception as e:
-        raise Exception(f"DeepInfra API error: {str(e)}")
+    def update(self, batch_len: int, seconds: float) -> None:
+        if batch_len < self.size:
+            return
+        if seconds > self.high:
+            new_size = max(self.size // 2, self.min_size)
+        elif seconds < self.low and batch_len == self.size:
+            new_size = min(self.size * 2, self.max_size)
+        else:
+            return
+        if new_size != self.size:
+            print(f"[async] batch size {self.size} -> {new_size} ({batch_len} texts took {seconds:.2f}s)")
+            self.size = new_size
+
+EMBED_BATCH_CONTROLLER = _BatchController(
+    EMBED_BATCH_SIZE,
+    EMBED_BATCH_MIN,
+    DEEPINFRA_MAX_BATCH,
+    EMBED_BATCH_TARGET_LOW_SECS,
+    EMBED_BATCH_TARGET_HIGH_SECS,
+)
+
+def current_embed_batch_size() -> int:
+    """Batch size for the next embeddings request (fixed unless EMBEDDING_BATCH_ADAPTIVE)."""
+    if EMBED_BATCH_ADAPTIVE:
+        return EMBED_BATCH_CONTROLLER.suggest()
+    return min(EMBED_BATCH_SIZE, DEEPINFRA_MAX_BATCH)
+
+API_RETRY_ATTEMPTS = 5
+API_RETRY_MAX_DELAY_SECS = 30.0
+
+def _retry_delay(attempt: int, err: Exception) -> float:
+    """Backoff before the next attempt: the server's Retry-After when given, else jittered exponential.
+
+    Jitter keeps many throttled workers from retrying in lockstep.
+    """
+    response = getattr(err, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(API_RETRY_MAX_DELAY_SECS, max(0.0, float(retry_after)))
+        except ValueError:
+            pass  # HTTP-date form; fall through to exponential backoff
+    return min(API_RETRY_MAX_DELAY_SECS, 0.25 * (2 ** attempt) * (1.0 + random.random() * 0.5))
 
 async def compute_embeddings_deepinfra_async(texts: List[str], api_key: str) -> np.ndarray:
     """Async embeddings using DeepInfra via AsyncOpenAI client"""
@@ -1299,72 +377,45 @@ async def compute_embeddings_deepinfra_async(texts: List[str], api_key: str) ->
         extra_body = {"normalize": True}
         if USE_PRIORITY_TIER:
             extra_body["service_tier"] = "priority"
-        # Retry loop to avoid transient throttling
+        # Retry loop to avoid transient throttling; each attempt gets its own timeout
+        # and retries stop once the next one could not finish within the overall budget
         last_err = None
-        for attempt in range(5):
+        started = time.perf_counter()
+        for attempt in range(API_RETRY_ATTEMPTS):
+            t0 = time.perf_counter()
             try:
-                t0 = time.perf_counter()
-                response = await client.embeddings.create(
-                    model=DEEPINFRA_MODEL,
-                    input=texts,
-                    encoding_format="float",
-                    extra_body=extra_body,
+                response = await asyncio.wait_for(
+                    client.embeddings.create(
+                        model=DEEPINFRA_MODEL,
+                        input=texts,
+                        encoding_format="float",
+                        extra_body=extra_body,
+                    ),
+                    timeout=API_ATTEMPT_TIMEOUT_SECS,
                 )
                 dt = time.perf_counter() - t0
                 embeddings = np.array([data.embedding for data in response.data], dtype=np.float32)
                 print(f"[async] embeddings.create batch_size={len(texts)} took {dt:.2f}s")
+                if EMBED_BATCH_ADAPTIVE:
+                    EMBED_BATCH_CONTROLLER.update(len(texts), dt)
                 return embeddings
             except Exception as e:
                 last_err = e
-                await asyncio.sleep(min(4.0, 0.25 * (2 ** attempt)))
-        raise Exception(f"DeepInfra API error after retries: {str(last_err)}")
+                if isinstance(e, asyncio.TimeoutError) and EMBED_BATCH_ADAPTIVE:
+                    EMBED_BATCH_CONTROLLER.update(len(texts), time.perf_counter() - t0)
+                if attempt + 1 >= API_RETRY_ATTEMPTS:
+                    break
+                delay = _retry_delay(attempt, e)
+                if time.perf_counter() - started + delay >= API_EMBED_TIMEOUT_SECS:
+                    break
+                await asyncio.sleep(delay)
+        raise Exception(f"DeepInfra API error after retries: {type(last_err).__name__}: {last_err}")
     except Exception as e:
         raise Exception(f"DeepInfra API error: {str(e)}")
 
 def _chunk_indices(total: int, chunk_size: int) -> List[Tuple[int, int]]:
     return [(i, min(i + chunk_size, total)) for i in range(0, total, chunk_size)]
 
-def _embed_batch_slice(args: Tuple[int, int, List[str], str]) -> Tuple[int, np.ndarray]:
-    start, end, texts, api_key = args
-    batch_vecs = compute_embeddings_deepinfra(texts[start:end], api_key)
-    return start, batch_vecs
-
-def compute_embeddings_parallel(
-    texts: List[str],
-    api_key: str,
-    batch_size: int = EMBED_BATCH_SIZE,
-    max_concurrency: int = MAX_CONCURRENCY,
-    progress_callback=None,
-) -> np.ndarray:
-    """Concurrent embedding across batches while preserving order."""
-    n = len(texts)
-    if n == 0:
-        return np.empty((0, 0), dtype=np.float32)
-
-    slices = _chunk_indices(n, batch_size)
-    results: Dict[int, np.ndarray] = {}
-
-    total_batches = len(slices)
-    completed = 0
-
-    with ThreadPoolExecutor(max_workers=max_concurrency) as ex:
-        futures = [
-            ex.submit(_embed_batch_slice, (start, end, texts, api_key))
-            for (start, end) in slices
-        ]
-        for fut in as_completed(futures):
-            start, vecs = fut.result()
-            results[start] = vecs
-            completed += 1
-            if progress_callback:
-                pct = int((completed / total_batches) * 100)
-                progress_callback(f"Embedding batches: {pct}% ({completed}/{total_batches})")
-
-    # Assemble in order
-    ordered_starts = sorted(results.keys())
-    assembled = np.vstack([results[s] for s in ordered_starts])
-    return assembled
-
 async def compute_embeddings_parallel_async(
     texts: List[str],
     api_key: str,
@@ -1377,28 +428,126 @@ async def compute_embeddings_parallel_async(
     if n == 0:
         return np.empty((0, 0), dtype=np.float32)
     slices = _chunk_indices(n, batch_size)
-    results: Dict[int, np.ndarray] = {}
+    out: Optional[np.ndarray] = None  # allocated once the first batch reveals the dimension
     sem = asyncio.Semaphore(max_concurrency)
     total_batches = len(slices)
     completed = 0
 
     async def worker(start: int, end: int):
-        nonlocal completed
+        nonlocal completed, out
         print(f"[async] launch target slice {start}:{end}")
         async with sem:
             vecs = await compute_embeddings_deepinfra_async(texts[start:end], api_key)
         print(f"[async] done target slice {start}:{end}")
-        results[start] = vecs
+        if out is None:
+            out = np.empty((n, vecs.shape[1]), dtype=np.float32)
+        out[start:end] = vecs
         completed += 1
         if progress_callback:
             pct = int((completed / total_batches) * 100)
             progress_callback(f"Embedding batches: {pct}% ({completed}/{total_batches})")
 
     await asyncio.gather(*(worker(start, end) for (start, end) in slices))
-    ordered_starts = sorted(results.keys())
-    return np.vstack([results[s] for s in ordered_starts])
+    return out
+
+async def embed_batched(
+    texts: List[str],
+    api_key: str,
+    batch_size: int = DEEPINFRA_MAX_BATCH,
+    max_concurrency: int = MAX_CONCURRENCY,
+    progress_callback=None,
+) -> np.ndarray:
+    """Embed texts in provider-sized requests issued concurrently; order is preserved."""
+    batch_size = max(1, min(batch_size, DEEPINFRA_MAX_BATCH))
+    if len(texts) <= batch_size:
+        return await compute_embeddings_deepinfra_async(texts, api_key)
+    return await compute_embeddings_parallel_async(
+        texts,
+        api_key,
+        batch_size=batch_size,
+        max_concurrency=max_concurrency,
+        progress_callback=progress_callback,
+    )
 
 # Local CPU Embedding Backend (async-compatible)
+def _torch_accelerator_available() -> bool:
+    try:
+        import torch
+        return torch.cuda.is_available() or torch.backends.mps.is_available()
+    except Exception:
+        return False
+
+def _onnx_session_options():
+    """ONNX Runtime session tuned for batch encoding: full graph fusion, one intra-op thread per core."""
+    import onnxruntime as ort
+    opts = ort.SessionOptions()
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    opts.intra_op_num_threads = os.cpu_count() or 1
+    return opts
+
+_QINT8_FILE_RE = re.compile(r"model_qint8_(arm64|avx2|avx512|avx512_vnni)\.onnx$")
+
+def _export_quantized_onnx(config_name: str) -> Path:
+    """Dynamic int8 (per-channel) quantization of the ONNX export into LOCAL_ONNX_EXPORT_DIR; returns the model dir."""
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+    target = LOCAL_ONNX_EXPORT_DIR / "onnx" / f"model_qint8_{config_name}.onnx"
+    if not target.exists():
+        print(f"[local] quantizing ONNX model ({config_name}) into {LOCAL_ONNX_EXPORT_DIR}")
+        base = SentenceTransformer(DEEPINFRA_MODEL, device="cpu", backend="onnx")
+        base.save(str(LOCAL_ONNX_EXPORT_DIR))
+        export_dynamic_quantized_onnx_model(base, config_name, str(LOCAL_ONNX_EXPORT_DIR))
+    return LOCAL_ONNX_EXPORT_DIR
+
+def _build_local_model() -> "SentenceTransformer":
+    """Instantiate the local model.
+
+    On CPU-only hosts the int8-quantized ONNX export is preferred when ONNX
+    Runtime is installed; CUDA/MPS machines keep the PyTorch backend.
+    """
+    # Lazy import to avoid heavy import if API is healthy
+    from sentence_transformers import SentenceTransformer
+    use_onnx = LOCAL_MODEL_BACKEND == "onnx" or (
+        LOCAL_MODEL_BACKEND == "auto" and ONNXRUNTIME_AVAILABLE and not _torch_accelerator_available()
+    )
+    if use_onnx:
+        def load_onnx(source: str) -> "SentenceTransformer":
+            return SentenceTransformer(
+                source,
+                device="cpu",
+                backend="onnx",
+                model_kwargs={
+                    "file_name": LOCAL_ONNX_FILE,
+                    "provider": "CPUExecutionProvider",
+                    "session_options": _onnx_session_options(),
+                },
+            )
+        qint8 = _QINT8_FILE_RE.search(LOCAL_ONNX_FILE)
+        sources = [DEEPINFRA_MODEL]
+        if qint8 and (LOCAL_ONNX_EXPORT_DIR / LOCAL_ONNX_FILE).exists():
+            sources.insert(0, str(LOCAL_ONNX_EXPORT_DIR))
+        for source in sources:
+            try:
+                model = load_onnx(source)
+                print(f"[local] loaded ONNX backend ({source}: {LOCAL_ONNX_FILE})")
+                return model
+            except Exception as e:
+                print(f"[local] ONNX model not loadable from {source}: {e}")
+        try:
+            if qint8:
+                # Hub repo lacks the quantized file: build it once and reuse it from disk afterwards
+                model = load_onnx(str(_export_quantized_onnx(qint8.group(1))))
+                print(f"[local] loaded locally quantized ONNX backend ({LOCAL_ONNX_FILE})")
+                return model
+        except Exception as e:
+            print(f"[local] ONNX quantization failed: {e}")
+        print("[local] ONNX backend unavailable, using PyTorch")
+    try:
+        import torch
+        torch.set_num_threads(os.cpu_count() or 1)
+    except Exception:
+        pass
+    return SentenceTransformer(DEEPINFRA_MODEL)
+
 async def _load_local_model() -> "SentenceTransformer":
     global _LOCAL_ST_MODEL
     if _LOCAL_ST_MODEL is not None:
@@ -1417,10 +566,11 @@ async def _load_local_model() -> "SentenceTransformer":
     except:
         pass
     
-    # Lazy import to avoid heavy import if API is healthy
-    from sentence_transformers import SentenceTransformer
     # Load CPU model (default behavior). This may take time on first run (download + init).
-    model = await asyncio.to_thread(SentenceTransformer, "thenlper/gte-large")
+    model = await run_blocking(_build_local_model)
+    if LOCAL_MAX_SEQ_LENGTH > 0:
+        # Truncation cap only; batches are still padded to their longest member
+        model.max_seq_length = min(model.max_seq_length or LOCAL_MAX_SEQ_LENGTH, LOCAL_MAX_SEQ_LENGTH)
     _LOCAL_ST_MODEL = model
     
     # Dismiss loading notification
@@ -1437,6 +587,54 @@ async def _load_local_model() -> "SentenceTransformer":
     
     return model
 
+def _local_device(model: "SentenceTransformer") -> str:
+    return getattr(getattr(model, "device", None), "type", "cpu")
+
+def auto_tune_batch(model: "SentenceTransformer", sample_texts: List[str], candidates: Tuple[int, ...]) -> int:
+    """Encode sample_texts once per candidate batch size and return the fastest (texts/second)."""
+    model.encode(sample_texts[:16], show_progress_bar=False)  # warm-up, so the first candidate is not penalized
+    best, best_rate = candidates[0], 0.0
+    for batch_size in candidates:
+        t0 = time.perf_counter()
+        model.encode(sample_texts, batch_size=batch_size, normalize_embeddings=True, show_progress_bar=False)
+        rate = len(sample_texts) / max(time.perf_counter() - t0, 1e-9)
+        print(f"[local] batch {batch_size}: {rate:,.0f} texts/s")
+        if rate > best_rate:
+            best, best_rate = batch_size, rate
+    return best
+
+def _local_encode_batch_size(model: "SentenceTransformer", texts: List[str]) -> int:
+    """Forward-pass batch size for the local model.
+
+    LOCAL_ENCODE_BATCH_SIZE wins when set. Otherwise the size measured by
+    auto_tune_batch for this device/model/backend is reused from
+    LOCAL_BATCH_TUNE_PATH. With LOCAL_BATCH_AUTOTUNE on, the first run with
+    enough texts measures it; everything else uses 256 on a GPU and 32 on CPU.
+    """
+    if LOCAL_ENCODE_BATCH_SIZE > 0:
+        return LOCAL_ENCODE_BATCH_SIZE
+    device = _local_device(model)
+    fallback = 256 if device in {"cuda", "mps"} else 32
+    key = f"{device}|{DEEPINFRA_MODEL}|{getattr(model, 'backend', 'torch')}"
+    try:
+        tuned = json.loads(LOCAL_BATCH_TUNE_PATH.read_text()) if LOCAL_BATCH_TUNE_PATH.exists() else {}
+    except Exception as e:
+        print(f"[local] batch tuning file unreadable: {e}")
+        tuned = {}
+    if key in tuned:
+        return int(tuned[key])
+    if not LOCAL_BATCH_AUTOTUNE or len(texts) < LOCAL_BATCH_TUNE_ROWS:
+        return fallback
+    candidates = tuple(b for b in LOCAL_BATCH_CANDIDATES if device != "cpu" or b <= 128)
+    tuned[key] = auto_tune_batch(model, texts[:LOCAL_BATCH_TUNE_ROWS], candidates)
+    print(f"[local] tuned batch size {tuned[key]} for {key}")
+    try:
+        LOCAL_BATCH_TUNE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        LOCAL_BATCH_TUNE_PATH.write_text(json.dumps(tuned, indent=2))
+    except Exception as e:
+        print(f"[local] batch tuning not saved: {e}")
+    return tuned[key]
+
 async def compute_embeddings_local_async(texts: List[str]) -> np.ndarray:
     # Minimal cleaning consistent with your embedding path
     texts = clean_text_for_embedding(texts)
@@ -1444,30 +642,39 @@ async def compute_embeddings_local_async(texts: List[str]) -> np.ndarray:
         return np.empty((0, 0), dtype=np.float32)
 
     model = await _load_local_model()
-    # Batch via your existing chunking to keep memory bounded
-    slices = _chunk_indices(len(texts), EMBED_BATCH_SIZE)
-    results: Dict[int, np.ndarray] = {}
-    completed = 0
-    total = len(slices)
-
-    async def work(start: int, end: int):
+    # Large chunks keep memory bounded; sentence-transformers batches inside each
+    # call. Chunks run one at a time because a single encode already uses every core.
+    # encode() pads each batch only to its longest member and length-sorts within a
+    # call; ordering the whole list by length first makes every chunk a tight bucket.
+    order = np.argsort(np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts)), kind="stable")
+    slices = _chunk_indices(len(texts), LOCAL_ENCODE_CHUNK)
+    out = np.empty((len(texts), model.get_sentence_embedding_dimension()), dtype=np.float32)
+    batch_size = await run_blocking(_local_encode_batch_size, model, texts)
+
+    for start, end in slices:
+        rows = order[start:end]
         # Run CPU-bound encode in a thread to keep event loop responsive
-        vecs = await asyncio.to_thread(model.encode, texts[start:end], normalize_embeddings=True)
-        # vecs is a numpy array
-        results[start] = vecs.astype(np.float32, copy=False)
-
-    await asyncio.gather(*(work(s, e) for (s, e) in slices))
-    # Assemble in order
-    ordered = [results[s] for s in sorted(results.keys())]
-    return np.vstack(ordered) if ordered else np.empty((0, 0), dtype=np.float32)
+        # and scatter straight into this chunk's rows of the output
+        out[rows] = await run_blocking(
+            model.encode,
+            [texts[i] for i in rows],
+            batch_size=batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+    return out
 
 # Resilient Wrapper (API first, CPU fallback)
 async def _try_api_embeddings(texts: List[str], api_key: str, progress_callback=None) -> np.ndarray:
-    # Wrap your existing async API call with a timeout
-    coro = compute_embeddings_deepinfra_async(texts, api_key)
-    return await asyncio.wait_for(coro, timeout=API_EMBED_TIMEOUT_SECS)
-
-async def compute_embeddings_resilient_async(
+    # Wrap the batched async API calls with a timeout. The budget is per wave of concurrent
+    # requests, so large lists aren't failed (and counted toward the fallback) for their size alone
+    batch_size = max(1, min(current_embed_batch_size(), DEEPINFRA_MAX_BATCH))
+    waves = math.ceil(math.ceil(len(texts) / batch_size) / max(1, MAX_CONCURRENCY)) if texts else 1
+    coro = embed_batched(texts, api_key, batch_size=batch_size, progress_callback=progress_callback)
+    return await asyncio.wait_for(coro, timeout=API_EMBED_TIMEOUT_SECS * waves)
+
+async def _compute_embeddings_resilient_uncached(
     texts: List[str],
     api_key: str,
     progress_callback=None,
@@ -1530,184 +737,675 @@ async def compute_embeddings_resilient_async(
         # Re-raise before we hit threshold so upstream can decide (e.g., show an error or retry)
         raise
 
+# ============================================================================
+# SIMILARITY KERNELS
+# ============================================================================
+
+def quantize_i8(vecs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-vector int8 quantization.
+
+    Returns one contiguous (N, D) int8 matrix plus the float32 scale of each
+    row, so `codes / scales[:, None]` recovers the original vectors.
+    """
+    vecs = np.asarray(vecs, dtype=np.float32)
+    if vecs.size == 0:
+        return np.empty(vecs.shape, dtype=np.int8), np.empty((vecs.shape[0],), dtype=np.float32)
+    max_abs = np.abs(vecs).max(axis=1)
+    scales = (127.0 / np.maximum(max_abs, 1e-12)).astype(np.float32)
+    codes = np.clip(np.rint(vecs * scales[:, None]), -127, 127).astype(np.int8)
+    return np.ascontiguousarray(codes), scales
+
+def cosine_i8(A: np.ndarray, B: np.ndarray) -> np.ndarray:
+    """Cosine similarity between int8-quantized rows (scale-invariant, so scales are not needed)."""
+    A = np.ascontiguousarray(A, dtype=np.int8)
+    B = np.ascontiguousarray(B, dtype=np.int8)
+    if A.shape[0] == 0 or B.shape[0] == 0:
+        return np.zeros((A.shape[0], B.shape[0]), dtype=np.float32)
+    if SIMSIMD_AVAILABLE:
+        distances = np.asarray(simsimd.cdist(A, B, metric="cosine"), dtype=np.float32)
+        return 1.0 - distances
+    return cosine_similarity(A.astype(np.float32), B.astype(np.float32))
+
+def l2_normalize(vecs: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so cosine similarity reduces to a dot product."""
+    vecs = np.asarray(vecs, dtype=np.float32)
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True) + np.float32(1e-12)
+    return np.ascontiguousarray(vecs / norms)
+
+def encode_for_scoring(vecs: np.ndarray) -> np.ndarray:
+    """Convert embeddings to the EMBED_DTYPE layout used for similarity scoring.
+
+    Float rows are L2-normalized once here, so scoring needs no norm passes.
+    """
+    if EMBED_DTYPE == "i8":
+        return quantize_i8(vecs)[0]
+    if EMBED_DTYPE == "f16":
+        return l2_normalize(vecs).astype(np.float16)
+    return l2_normalize(vecs)
+
+_SCORE_TILE_ROWS = 4096  # target rows per GEMM tile (f16 upcast, blocked top-1)
+
+def score_matrix(A: np.ndarray, B: np.ndarray) -> np.ndarray:
+    """Cosine similarity for matrices produced by encode_for_scoring."""
+    if A.dtype == np.int8:
+        return cosine_i8(A, B)
+    if A.shape[0] == 0 or B.shape[0] == 0:
+        return np.zeros((A.shape[0], B.shape[0]), dtype=np.float32)
+    if B.dtype == np.float16:
+        # Upcast targets one L2-sized tile at a time; numpy has no fast f16 GEMM
+        A32 = A.astype(np.float32)
+        out = np.empty((A.shape[0], B.shape[0]), dtype=np.float32)
+        for start in range(0, B.shape[0], _SCORE_TILE_ROWS):
+            tile = B[start:start + _SCORE_TILE_ROWS].astype(np.float32)
+            out[:, start:start + len(tile)] = A32 @ tile.T
+        return out
+    return A @ B.T  # rows are unit-norm: one GEMM
+
+def blocked_top1(A: np.ndarray, B: np.ndarray, block: int = _SCORE_TILE_ROWS) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise argmax/max of A @ B.T for unit-norm float rows, one BLAS GEMM per target tile.
+
+    Only an (N, block) score tile is live at a time; float16 targets are
+    upcast per tile. Ties keep the lowest index, like a full argmax.
+    """
+    A32 = np.ascontiguousarray(A, dtype=np.float32)
+    best_idx = np.zeros(len(A32), dtype=np.int64)
+    best_score = np.full(len(A32), -np.inf, dtype=np.float32)
+    for start in range(0, B.shape[0], block):
+        tile = np.asarray(B[start:start + block], dtype=np.float32)
+        sims = A32 @ tile.T
+        idx = sims.argmax(axis=1)
+        score = sims[np.arange(len(idx)), idx]
+        better = score > best_score
+        best_idx[better] = idx[better] + start
+        best_score[better] = score[better]
+    return best_idx, best_score
+
+@lru_cache(maxsize=1)
+def _bf16_gemm_available() -> bool:
+    """True when torch is importable and the CPU has native BF16 matmul (AVX512-BF16 or AMX)."""
+    try:
+        import torch
+    except Exception:
+        return False
+    checks = ("_is_amx_tile_supported", "_is_avx512_bf16_supported")
+    return any(getattr(torch.cpu, name, lambda: False)() for name in checks)
+
+def _bf16_scores(A: np.ndarray, B: np.ndarray) -> np.ndarray:
+    """A @ B.T through oneDNN's BF16 kernels (float32 accumulation)."""
+    import torch
+    with torch.inference_mode(), torch.autocast("cpu", dtype=torch.bfloat16):
+        return (torch.from_numpy(A) @ torch.from_numpy(B).T).float().numpy()
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Column indices of the k highest scores in each row, best first.
+
+    Uses an O(M) argpartition per row and only sorts the k survivors.
+    """
+    scores = np.atleast_2d(scores)
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if k < scores.shape[1]:
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    order = np.argsort(-np.take_along_axis(scores, idx, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(idx, order, axis=1)
+
+def build_ann_index(target_matrix: np.ndarray):
+    """FAISS inner-product index over unit-norm float32 targets, or None for small/quantized corpora."""
+    if not FAISS_AVAILABLE or target_matrix.dtype != np.float32 or len(target_matrix) < ANN_MIN_CORPUS:
+        return None
+    dim = target_matrix.shape[1]
+    if ANN_INDEX == "hnsw" or (ANN_INDEX == "auto" and len(target_matrix) >= ANN_HNSW_MIN_CORPUS):
+        index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efSearch = 64  # faiss default (16) trades away too much top-1 recall
+    else:
+        index = faiss.IndexFlatIP(dim)
+    index.add(np.ascontiguousarray(target_matrix, dtype=np.float32))
+    return index
+
+def best_match(A: np.ndarray, B: np.ndarray, index=None) -> Tuple[np.ndarray, np.ndarray]:
+    """Index and cosine score of the closest row of B for every row of A.
+
+    A FAISS index from build_ann_index is searched directly when given. While
+    the CPU fallback is active on BF16-capable hardware, winners are chosen
+    with a torch BF16 GEMM. Other float inputs go through blocked_top1, so no
+    (N, M) matrix is materialized.
+    """
+    if index is not None and len(A):
+        scores, idx = index.search(np.ascontiguousarray(A, dtype=np.float32), 1)
+        return idx[:, 0].astype(np.int64), scores[:, 0]
+    if FALLBACK_ACTIVE and A.dtype == np.float32 and B.dtype == np.float32 and len(A) and len(B) and _bf16_gemm_available():
+        # CPU fallback (torch already loaded): pick winners with a BF16 GEMM, then
+        # rescore just those pairs in float32 so reported scores keep full precision
+        try:
+            idx = _bf16_scores(A, B).argmax(axis=1)
+            return idx, np.einsum("nd,nd->n", A, B[idx])
+        except Exception as e:
+            print(f"[local] BF16 scoring failed, using float32: {e}")
+    if A.dtype != np.int8 and len(A) and len(B):
+        return blocked_top1(A, B)
+    sim = score_matrix(A, B)
+    idx = sim.argmax(axis=1)
+    return idx, sim[np.arange(len(idx)), idx]
+
+def fit_pca_projection(target_matrix: np.ndarray) -> Optional[np.ndarray]:
+    """(EMBED_PCA_DIM, dim) principal axes of unit-norm float32 targets, or None when PCA does not apply."""
+    if (
+        EMBED_PCA_DIM <= 0
+        or target_matrix.dtype != np.float32
+        or len(target_matrix) < EMBED_PCA_MIN_CORPUS
+        or EMBED_PCA_DIM >= target_matrix.shape[1]
+    ):
+        return None
+    pca = PCA(n_components=EMBED_PCA_DIM, svd_solver="randomized", random_state=0).fit(target_matrix)
+    kept = float(pca.explained_variance_ratio_.sum())
+    print(f"[pca] {target_matrix.shape[1]} -> {EMBED_PCA_DIM} dims ({kept:.1%} of variance)")
+    return np.ascontiguousarray(pca.components_, dtype=np.float32)
+
+def project_rows(vecs: np.ndarray, components: np.ndarray) -> np.ndarray:
+    """Project unit-norm rows onto the PCA axes and re-normalize, so every scoring path stays cosine."""
+    return l2_normalize(vecs @ components.T)
+
+def projected_best_match(
+    A: np.ndarray,
+    B: np.ndarray,
+    A_red: np.ndarray,
+    B_red: np.ndarray,
+    index=None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """best_match via a reduced-space shortlist: EMBED_PCA_RERANK candidates are rescored in full dims.
+
+    Reported scores are exact full-width cosines of the chosen rows.
+    """
+    k = min(EMBED_PCA_RERANK, len(B))
+    if index is not None:
+        cand = index.search(np.ascontiguousarray(A_red, dtype=np.float32), k)[1]
+        cand = np.where(cand < 0, cand[:, :1], cand)  # HNSW pads short result lists with -1
+    else:
+        cand = top_k(score_matrix(A_red, B_red), k)
+    cand_scores = np.einsum("nd,nmd->nm", A, B[cand])
+    pick = cand_scores.argmax(axis=1)
+    rows = np.arange(len(pick))
+    return cand[rows, pick], cand_scores[rows, pick]
+
+def prefiltered_best_match(
+    A: np.ndarray,
+    B: np.ndarray,
+    query_texts: List[str],
+    corpus_texts: List[str],
+    top_m: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """best_match restricted to each query's top-M fuzzy (token_set_ratio) candidates.
+
+    Expects unit-norm float rows from encode_for_scoring; only N x M dot
+    products are computed instead of N x len(corpus). Results are approximate:
+    when the closest embedding is not among the top-M fuzzy candidates, a
+    lower-scoring target wins. The default FUZZY_PREFILTER_TOP_M=0 never calls
+    this and scores every target exactly (see tools/check_prefilter.py).
+    """
+    fuzzy = process.cdist(query_texts, corpus_texts, scorer=fuzz.token_set_ratio, dtype=np.uint8, workers=-1)
+    cand = top_k(fuzzy, top_m)
+    cand_scores = np.einsum(
+        "nd,nmd->nm", A.astype(np.float32, copy=False), B[cand].astype(np.float32, copy=False)
+    )
+    pick = cand_scores.argmax(axis=1)
+    rows = np.arange(len(pick))
+    return cand[rows, pick], cand_scores[rows, pick]
+
+# ============================================================================
+# EMBEDDING CACHE
+# ============================================================================
+
+def _embedding_backend(compute=None) -> str:
+    """Which encoder the vectors come from: "api", or "local" (forced or CPU fallback).
+
+    The local model truncates at LOCAL_MAX_SEQ_LENGTH and may be int8 ONNX, so
+    its vectors must never be cached or scored as API vectors.
+    """
+    if compute is _try_api_embeddings:
+        return "api"
+    return "local" if (MODEL_FALLBACK_MODE == "local" or FALLBACK_ACTIVE) else "api"
+
+class EmbeddingCache:
+    """Persistent SQLite cache of embeddings keyed by model + backend + normalized text.
+
+    Keys are the first 16 bytes of sha256(model + "\0" + text) with whitespace
+    collapsed (the GTE tokenizer ignores it); local-model vectors use the model
+    name suffixed with "@local". Vectors are stored in the EMBED_DTYPE layout:
+    raw float32/float16, or int8 codes plus a per-row scale.
+    """
+
+    _MAX_PARAMS = 500  # stay well under SQLite's bound-parameter limit
+
+    def __init__(self, path: str, model_name: str):
+        self.path = path
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key BLOB PRIMARY KEY, dtype TEXT NOT NULL, scale REAL, vec BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _key(self, text: str, backend: str = "api") -> bytes:
+        normalized = _MULTISPACE_RE.sub(' ', str(text).strip())
+        model = self.model_name if backend == "api" else f"{self.model_name}@{backend}"
+        return hashlib.sha256(f"{model}\0{normalized}".encode("utf-8")).digest()[:16]
+
+    @staticmethod
+    def _decode(dtype: str, scale: Optional[float], blob: bytes) -> np.ndarray:
+        if dtype == "i8":
+            return np.frombuffer(blob, dtype=np.int8).astype(np.float32) / np.float32(scale)
+        if dtype == "f16":
+            return np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+        return np.frombuffer(blob, dtype=np.float32).copy()
+
+    def get_many(self, texts: List[str], backend: str = "api") -> Tuple[Dict[str, np.ndarray], List[str]]:
+        """Return (hits keyed by text, unique misses in first-seen order)."""
+        unique = list(dict.fromkeys(texts))
+        keys = {text: self._key(text, backend) for text in unique}
+        rows: Dict[bytes, np.ndarray] = {}
+        key_list = list(set(keys.values()))
+        with self._lock:
+            for i in range(0, len(key_list), self._MAX_PARAMS):
+                chunk = key_list[i:i + self._MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                cur = self._conn.execute(
+                    f"SELECT key, dtype, scale, vec FROM embeddings WHERE key IN ({placeholders})", chunk
+                )
+                for key, dtype, scale, blob in cur:
+                    rows[key] = self._decode(dtype, scale, blob)
+        hits = {text: rows[key] for text, key in keys.items() if key in rows}
+        misses = [text for text in unique if text not in hits]
+        return hits, misses
+
+    def put_many(self, mapping: Dict[str, np.ndarray], backend: str = "api") -> None:
+        if not mapping:
+            return
+        texts = list(mapping.keys())
+        vecs = np.asarray([mapping[t] for t in texts], dtype=np.float32)
+        if EMBED_DTYPE == "i8":
+            codes, scales = quantize_i8(vecs)
+            records = [
+                (self._key(t, backend), "i8", float(scales[i]), codes[i].tobytes()) for i, t in enumerate(texts)
+            ]
+        elif EMBED_DTYPE == "f16":
+            half = vecs.astype(np.float16)
+            records = [(self._key(t, backend), "f16", None, half[i].tobytes()) for i, t in enumerate(texts)]
+        else:
+            records = [(self._key(t, backend), "f32", None, vecs[i].tobytes()) for i, t in enumerate(texts)]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dtype, scale, vec) VALUES (?, ?, ?, ?)", records
+            )
+            self._conn.commit()
+
+    def warm(self) -> None:
+        """Read every stored vector once so the pages sit in the OS cache."""
+        try:
+            with self._lock:
+                self._conn.execute("SELECT sum(length(vec)) FROM embeddings").fetchone()
+        except Exception as e:
+            print(f"[cache] warm-up failed: {e}")
+
+def _open_embedding_cache() -> Optional[EmbeddingCache]:
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    try:
+        cache = EmbeddingCache(EMBEDDING_CACHE_PATH, DEEPINFRA_MODEL)
+    except Exception as e:
+        print(f"[cache] embedding cache disabled ({e})")
+        return None
+    threading.Thread(target=cache.warm, name="embedding-cache-warm", daemon=True).start()
+    return cache
+
+EMBED_CACHE: Optional[EmbeddingCache] = _open_embedding_cache()
+
+class EmbeddingStore:
+    """Embeddings for unique texts held as one contiguous (N, D) float32 matrix."""
+
+    def __init__(self, texts: List[str], vectors: np.ndarray):
+        self.text_index: Dict[str, int] = {text: i for i, text in enumerate(texts)}
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def rows(self, texts: List[str]) -> np.ndarray:
+        """Gather the rows for `texts` (duplicates allowed) with one fancy-index copy."""
+        idx = np.fromiter((self.text_index[t] for t in texts), dtype=np.int64, count=len(texts))
+        return self.vectors[idx]
+
+async def compute_embeddings_resilient_async(
+    texts: List[str],
+    api_key: str,
+    progress_callback=None,
+    compute=None,
+) -> np.ndarray:
+    """Resilient embeddings with the persistent cache in front: only distinct misses are computed.
+
+    `compute` replaces the API-with-CPU-fallback path for the misses (same signature).
+    """
+    compute = compute or _compute_embeddings_resilient_uncached
+    if len(texts) == 0:
+        return await compute(texts, api_key, progress_callback)
+    if EMBED_CACHE is None:
+        unique = list(dict.fromkeys(texts))
+        if len(unique) == len(texts):
+            return await compute(texts, api_key, progress_callback)
+        vecs = await compute(unique, api_key, progress_callback)
+        return EmbeddingStore(unique, vecs).rows(texts)
+    backend = _embedding_backend(compute)
+    hits, misses = await run_blocking(EMBED_CACHE.get_many, texts, backend)
+    known = list(hits)
+    vecs = None
+    if misses:
+        vecs = await compute(misses, api_key, progress_callback)
+        produced = _embedding_backend(compute)
+        await run_blocking(EMBED_CACHE.put_many, dict(zip(misses, vecs)), produced)
+        if produced != backend and hits:
+            # Fell back to the local model mid-call: the cached hits are API vectors, so only those are
+            # looked up again (and embedded if missing) under the local backend
+            local = await compute_embeddings_resilient_async(known, api_key, progress_callback, compute)
+            hits = dict(zip(known, local))
+    # Hits and fresh rows go straight into one typed buffer (no intermediate concatenate)
+    dim = vecs.shape[1] if vecs is not None else hits[known[0]].shape[0]
+    matrix = np.empty((len(known) + len(misses), dim), dtype=np.float32)
+    if known:
+        np.stack([hits[t] for t in known], out=matrix[:len(known)])
+    if vecs is not None:
+        matrix[len(known):] = vecs
+    store = EmbeddingStore(known + misses, matrix)
+    return store.rows(texts)
+
+def _target_cache_file(target_list: List[str], backend: str) -> Path:
+    digest = hashlib.blake2b("\0".join(target_list).encode("utf-8"), digest_size=16).hexdigest()
+    # Files hold the encode_for_scoring layout, so each EMBED_DTYPE has its own; API and
+    # local-fallback vectors live in different spaces, so each backend does too
+    return TARGET_EMBED_CACHE_DIR / f"{digest}.{backend}.scoring-{EMBED_DTYPE}.npy"
+
+_SCORING_DTYPES = {"f32": np.float32, "f16": np.float16, "i8": np.int8}
+
+def _load_target_matrix(path: Path, n: int) -> Optional[np.ndarray]:
+    """Memory-map a cached scoring matrix read-only: pages come from the OS cache and are shared across workers."""
+    try:
+        if path.exists():
+            vecs = np.load(path, mmap_mode="r")
+            if vecs.ndim == 2 and vecs.shape[0] == n and vecs.dtype == _SCORING_DTYPES[EMBED_DTYPE]:
+                return vecs
+    except Exception as e:
+        print(f"[cache] target matrix unreadable, recomputing: {e}")
+    return None
+
+def _save_target_matrix(path: Path, vecs: np.ndarray) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, vecs)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"[cache] target matrix write failed: {e}")
+
+async def _load_or_compute_target_matrix(path: Path, target_list: List[str], api_key: str, progress_callback, compute):
+    matrix = await run_blocking(_load_target_matrix, path, len(target_list))
+    if matrix is not None:
+        print(f"[cache] target matrix hit ({len(target_list):,} rows)")
+        return matrix
+    vecs = await compute_embeddings_resilient_async(target_list, api_key, progress_callback, compute)
+    matrix = encode_for_scoring(vecs)
+    del vecs
+    # The circuit may have opened mid-build; file the matrix under the backend that produced it
+    await run_blocking(_save_target_matrix, _target_cache_file(target_list, _embedding_backend(compute)), matrix)
+    return matrix
+
+# In-flight target matrix builds keyed by (cache file, event loop); a run started while the
+# same list is still being prewarmed waits for that build instead of embedding it twice
+_TARGET_INFLIGHT: Dict[Tuple[Path, int], "asyncio.Future"] = {}
+
+async def get_or_compute_target_matrix(
+    target_list: List[str],
+    api_key: str,
+    progress_callback=None,
+    compute=None,
+) -> np.ndarray:
+    """Targets in the encode_for_scoring layout, memory-mapped from one .npy file when the same list was embedded before.
+
+    Skips the API, the per-text SQLite lookups and the normalization pass on
+    the common "one reference table, many uploads" path. Concurrent calls for
+    the same list share one build. Cached matrices are read-only.
+    """
+    if not TARGET_EMBED_CACHE_ENABLED or len(target_list) == 0:
+        vecs = await compute_embeddings_resilient_async(target_list, api_key, progress_callback, compute)
+        return encode_for_scoring(vecs)
+    path = _target_cache_file(target_list, _embedding_backend(compute))
+    key = (path, id(asyncio.get_running_loop()))
+    shared = _TARGET_INFLIGHT.get(key)
+    if shared is not None:
+        try:
+            return await asyncio.shield(shared)
+        except Exception as e:
+            # The other caller's failure (e.g. an API-only prewarm); build with this caller's settings
+            print(f"[cache] shared target build failed ({type(e).__name__}); retrying")
+    task = asyncio.ensure_future(_load_or_compute_target_matrix(path, target_list, api_key, progress_callback, compute))
+    _TARGET_INFLIGHT[key] = task
+    task.add_done_callback(lambda t: _TARGET_INFLIGHT.pop(key, None) if _TARGET_INFLIGHT.get(key) is t else None)
+    # Shielded so a cancelled run does not abort a build other callers may be waiting on
+    return await asyncio.shield(task)
+
+async def prewarm_target_embeddings(target_list: List[str], api_key: str, delay: float = 0.0) -> None:
+    """Fill the target matrix cache ahead of a run, API only (never trips the CPU fallback)."""
+    if delay:
+        await asyncio.sleep(delay)
+    try:
+        await get_or_compute_target_matrix(target_list, api_key, compute=_try_api_embeddings)
+        print(f"[cache] target matrix prewarmed ({len(target_list):,} rows)")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"[cache] target prewarm failed: {type(e).__name__}: {e}")
+
+@lru_cache(maxsize=131072)
+def _clean_simple_one(text: str) -> str:
+    text = text.strip()
+    text = _MULTISPACE_RE.sub(' ', text)  # Multiple spaces to single
+    text = _PUNCT_RE.sub('', text)  # Keep basic punctuation
+    return text.lower()
+
+@lru_cache(maxsize=131072)
+def _clean_embed_one(text: str) -> str:
+    return _MULTISPACE_RE.sub(' ', text.strip())
+
 def clean_text_simple(text_list: List[str]) -> List[str]:
-    """Clean text by removing punctuation and extra spaces"""
-    cleaned = []
-    for text in text_list:
-        text = str(text).strip()
-        text = re.sub(r'\s+', ' ', text)  # Multiple spaces to single
-        text = re.sub(r'[^\w\s,.-]', '', text)  # Keep basic punctuation
-        cleaned.append(text.lower())
-    return cleaned
+    """Clean text by removing punctuation and extra spaces (memoized per string)"""
+    return [_clean_simple_one(str(text)) for text in text_list]
 
 def clean_text_for_embedding(text_list: List[str]) -> List[str]:
-    """Minimal cleaning for embedding models"""
-    cleaned = []
-    for text in text_list:
-        text = str(text).strip()
-        text = re.sub(r'\s+', ' ', text)
-        cleaned.append(text)
-    return cleaned
-
-def run_fuzzy_match(input_list: List[str], target_list: List[str], clean: bool = True) -> Dict:
-    """Run fuzzy string matching"""
+    """Minimal cleaning for embedding models (memoized per string)"""
+    return [_clean_embed_one(str(text)) for text in text_list]
+
+_FUZZY_BLOCK_BYTES = 64 << 20  # float32 cdist block budget per input block
+
+def fuzzy_block_rows(n_targets: int, max_rows: int = 2048) -> int:
+    """Inputs per cdist block so one (rows, n_targets) float32 block stays within _FUZZY_BLOCK_BYTES."""
+    return max(1, min(max_rows, _FUZZY_BLOCK_BYTES // (4 * max(1, n_targets))))
+
+def run_fuzzy_match(
+    input_list: List[str],
+    target_list: List[str],
+    clean: bool = True,
+    score_cutoff: int = 0,
+    block_size: Optional[int] = None,
+) -> Dict:
+    """Run fuzzy string matching
+
+    Scores each block of inputs against all targets with one multi-threaded
+    rapidfuzz cdist call; matches below `score_cutoff` (0-100) score 0. The
+    block defaults to fuzzy_block_rows, so memory stays bounded for large
+    target lists.
+    """
     if clean:
         input_list = clean_text_simple(input_list)
         target_list = clean_text_simple(target_list)
+    if block_size is None:
+        block_size = fuzzy_block_rows(len(target_list))
     
-    matches = []
-    scores = []
+    best_idx = np.zeros(len(input_list), dtype=np.int64)
+    best_scores = np.zeros(len(input_list), dtype=np.float32)
     
-    for input_desc in input_list:
-        best_match, score, _ = process.extractOne(
-            input_desc, 
-            target_list, 
-            scorer=fuzz.ratio
+    for start in range(0, len(input_list), block_size):
+        ratios = process.cdist(
+            input_list[start:start + block_size],
+            target_list,
+            scorer=fuzz.ratio,
+            score_cutoff=score_cutoff,
+            dtype=np.float32,  # uint8 would round every ratio to a whole percent
+            workers=-1,
         )
-        matches.append(best_match)
-        scores.append(score / 100.0)  # Normalize to 0-1
+        idx = ratios.argmax(axis=1)
+        best_idx[start:start + len(idx)] = idx
+        best_scores[start:start + len(idx)] = ratios[np.arange(len(idx)), idx]
     
+    matches = [target_list[i] for i in best_idx.tolist()]
+    scores = (best_scores / 100.0).tolist()  # Normalize to 0-1
     return {"match": matches, "score": scores}
 
-def run_tfidf_match(input_list: List[str], target_list: List[str], clean: bool = True) -> Dict:
-    """Run TF-IDF matching with cosine similarity"""
+def run_tfidf_match(
+    input_list: List[str],
+    target_list: List[str],
+    clean: bool = True,
+    block_size: int = 2048,
+) -> Dict:
+    """Run TF-IDF matching with cosine similarity
+
+    The vectorizer is fit on inputs and targets together, so input-only tokens
+    count toward each input's norm. TF-IDF rows are L2-normalized, so the
+    sparse dot product equals cosine. Each block of inputs is scored as a
+    sparse product and reduced with a sparse argmax, so no dense
+    (inputs x targets) matrix is built.
+    """
     if clean:
         input_list = clean_text_simple(input_list)
         target_list = clean_text_simple(target_list)
     
-    combined = input_list + target_list
-    
-    vectorizer = TfidfVectorizer()
-    vectorizer.fit(combined)
+    tfidf_all = TfidfVectorizer().fit_transform(input_list + target_list)
+    tfidf_input = tfidf_all[:len(input_list)]
+    target_t = tfidf_all[len(input_list):].T.tocsc()
     
-    tfidf_input = vectorizer.transform(input_list)
-    tfidf_target = vectorizer.transform(target_list)
+    best_idx = np.zeros(len(input_list), dtype=np.int64)
+    best_scores = np.zeros(len(input_list), dtype=np.float64)
+    for start in range(0, len(input_list), block_size):
+        sim = (tfidf_input[start:start + block_size] @ target_t).tocsr()
+        sim.sort_indices()  # ties resolve to the lowest target index, as with a dense argmax
+        end = start + sim.shape[0]
+        best_idx[start:end] = np.asarray(sim.argmax(axis=1)).ravel()
+        best_scores[start:end] = sim.max(axis=1).toarray().ravel()
     
-    similarity_matrix = cosine_similarity(tfidf_input, tfidf_target)
-    
-    matches = []
-    scores = []
-    
-    for row in similarity_matrix:
-        best_idx = np.argmax(row)
-        best_score = row[best_idx]
-        best_match = target_list[best_idx]
-        
-        matches.append(best_match)
-        scores.append(float(best_score))
+    matches = [target_list[i] for i in best_idx.tolist()]
+    scores = best_scores.tolist()
     
     return {"match": matches, "score": scores}
 
-def run_embed_match(
-    input_list: List[str],
-    target_list: List[str],
-    api_key: str,
-    batch_size: int = EMBED_BATCH_SIZE,
-    progress_callback=None,
-    max_concurrency: int = MAX_CONCURRENCY,
-    clean_input: bool = False,
-    clean_target: bool = False,
-) -> Dict:
-    """Run semantic embedding matching using DeepInfra API with concurrent batching.
-
-    Respects DeepInfra's 1024 max batch size and uses up to `max_concurrency`
-    concurrent requests to reduce wall-clock time. Results are reassembled in
-    the original order.
-    """
-    # Apply cleaning based on user selection
-    input_list_clean = clean_text_for_embedding(input_list) if clean_input else input_list
-    target_list_clean = clean_text_for_embedding(target_list) if clean_target else target_list
+_PREPARED_TARGETS: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
 
-    total_inputs = len(input_list_clean)
-    total_targets = len(target_list_clean)
+def _prepared_targets_key(target_list: List[str], backend: str) -> Tuple[str, str]:
+    digest = hashlib.blake2b("\0".join(target_list).encode("utf-8"), digest_size=16).hexdigest()
+    # API and local-fallback vectors live in different spaces, so they never share an entry
+    return digest, backend
 
-    # 1) Compute target embeddings concurrently (once per run)
-    if progress_callback:
-        progress_callback("Computing target embeddings (concurrent)...")
-    target_embeddings = compute_embeddings_parallel(
-        target_list_clean,
-        api_key,
-        batch_size=min(batch_size, 1024),
-        max_concurrency=max_concurrency,
-        progress_callback=progress_callback,
-    )
-
-    # 2) Prepare concurrent input embedding + local similarity
-    if progress_callback:
-        progress_callback("Computing input embeddings (concurrent)...")
-
-    input_slices = _chunk_indices(total_inputs, min(batch_size, 1024))
-    results_match: Dict[int, List[str]] = {}
-    results_score: Dict[int, List[float]] = {}
-
-    def _process_input_slice(args: Tuple[int, int]) -> Tuple[int, List[str], List[float]]:
-        start, end = args
-        emb = compute_embeddings_deepinfra(input_list_clean[start:end], api_key)
-        sim = cosine_similarity(emb, target_embeddings)
-        batch_matches: List[str] = []
-        batch_scores: List[float] = []
-        for row in sim:
-            idx = int(np.argmax(row))
-            batch_matches.append(target_list[idx])
-            batch_scores.append(float(row[idx]))
-        return start, batch_matches, batch_scores
-
-    total_batches = len(input_slices)
-    completed = 0
-    with ThreadPoolExecutor(max_workers=max_concurrency) as ex:
-        futures = [ex.submit(_process_input_slice, sl) for sl in input_slices]
-        for fut in as_completed(futures):
-            start, m, s = fut.result()
-            results_match[start] = m
-            results_score[start] = s
-            completed += 1
-            if progress_callback:
-                pct = int((completed / total_batches) * 100)
-                progress_callback(f"Matching: {pct}% ({completed}/{total_batches})")
+def _remember_prepared_targets(key: Tuple[str, str], prepared: tuple) -> None:
+    if PREPARED_TARGETS_MAX <= 0:
+        return
+    _PREPARED_TARGETS[key] = prepared
+    _PREPARED_TARGETS.move_to_end(key)
+    while len(_PREPARED_TARGETS) > PREPARED_TARGETS_MAX:
+        _PREPARED_TARGETS.popitem(last=False)
 
-    # 3) Assemble results in order
-    matches: List[str] = []
-    scores: List[float] = []
-    for start in sorted(results_match.keys()):
-        matches.extend(results_match[start])
-        scores.extend(results_score[start])
+def distinct_embedding_targets(target_list: List[str], clean_target: bool) -> Tuple[List[str], np.ndarray]:
+    """Distinct (optionally cleaned) target texts to embed, plus the first row each came from.
 
-    if progress_callback:
-        progress_callback("Finalizing results...")
-
-    return {"match": matches, "score": scores}
+    Winners map back to the first occurrence, which is the row a full argmax
+    over duplicate ties picks anyway.
+    """
+    target_list_clean = clean_text_for_embedding(target_list) if clean_target else target_list
+    target_first: Dict[str, int] = {}
+    for i, text in enumerate(target_list_clean):
+        target_first.setdefault(text, i)
+    return list(target_first), np.fromiter(target_first.values(), dtype=np.int64, count=len(target_first))
 
 async def run_embed_match_async(
     input_list: List[str],
     target_list: List[str],
     api_key: str,
-    batch_size: int = EMBED_BATCH_SIZE,
+    batch_size: Optional[int] = None,
     progress_callback=None,
     max_concurrency: int = MAX_CONCURRENCY,
     clean_input: bool = False,
     clean_target: bool = False,
 ) -> Dict:
-    """Async version using AsyncOpenAI and asyncio concurrency."""
+    """Run semantic embedding matching with asyncio-gathered AsyncOpenAI calls.
+
+    Respects DeepInfra's 1024 max batch size and keeps up to `max_concurrency`
+    requests in flight on a single event loop. Results are reassembled in the
+    original order. `batch_size` defaults to the adaptive controller's size.
+    """
     # Apply cleaning based on user selection
     input_list_clean = clean_text_for_embedding(input_list) if clean_input else input_list
-    target_list_clean = clean_text_for_embedding(target_list) if clean_target else target_list
+    unique_targets, target_rows = distinct_embedding_targets(target_list, clean_target)
 
-    # 1) Targets once
+    # 1) Targets once, in the background: input batches are embedded meanwhile
+    # and only wait for the targets when they reach the similarity step
     if progress_callback:
         progress_callback("Computing target embeddings (async concurrent)...")
-    target_embeddings = await compute_embeddings_resilient_async(
-        target_list_clean,
-        api_key,
-        progress_callback=progress_callback,
-    )
+
+    async def prepare_targets():
+        key = _prepared_targets_key(unique_targets, _embedding_backend())
+        prepared = _PREPARED_TARGETS.get(key)
+        if prepared is not None:
+            _PREPARED_TARGETS.move_to_end(key)
+            print(f"[cache] prepared targets reused ({len(unique_targets):,} rows)")
+            return prepared
+        target_matrix = await get_or_compute_target_matrix(
+            unique_targets,
+            api_key,
+            progress_callback=progress_callback,
+        )
+        # The circuit may have opened mid-build; file the entry under the backend that produced it
+        built_key = _prepared_targets_key(unique_targets, _embedding_backend())
+        # Fitting is CPU-bound; keep the event loop free for in-flight input batches
+        components = await run_blocking(fit_pca_projection, target_matrix)
+        target_reduced = project_rows(target_matrix, components) if components is not None else None
+        target_index = build_ann_index(target_reduced if target_reduced is not None else target_matrix)
+        use_prefilter = (
+            0 < FUZZY_PREFILTER_TOP_M < len(unique_targets)
+            and target_index is None
+            and components is None
+            and target_matrix.dtype != np.int8
+        )
+        prepared = (target_matrix, target_index, use_prefilter, components, target_reduced)
+        _remember_prepared_targets(built_key, prepared)
+        return prepared
+
+    targets_task = asyncio.create_task(prepare_targets())
 
     # 2) Inputs concurrent and local similarity
     if progress_callback:
         progress_callback("Computing input embeddings (async concurrent)...")
 
-    input_slices = _chunk_indices(len(input_list_clean), min(batch_size, 1024))
-    results_match: Dict[int, List[str]] = {}
-    results_score: Dict[int, List[float]] = {}
+    # Embed and score each distinct input once; duplicates are broadcast back at the end
+    unique_inputs = list(dict.fromkeys(input_list_clean))
+    unique_pos = {text: i for i, text in enumerate(unique_inputs)}
+    inverse = [unique_pos[text] for text in input_list_clean]
+
+    if batch_size is None:
+        batch_size = current_embed_batch_size()
+    input_slices = _chunk_indices(len(unique_inputs), min(batch_size, DEEPINFRA_MAX_BATCH))
+    # Each worker writes its disjoint slice of the winners in place
+    best_idx_all = np.zeros(len(unique_inputs), dtype=np.int64)
+    best_score_all = np.zeros(len(unique_inputs), dtype=np.float32)
     sem = asyncio.Semaphore(max_concurrency)
     completed = 0
     total_batches = len(input_slices)
@@ -1716,35 +1414,171 @@ async def run_embed_match_async(
         nonlocal completed
         print(f"[async] launch input slice {start}:{end}")
         async with sem:
-            emb = await compute_embeddings_resilient_async(input_list_clean[start:end], api_key, progress_callback)
+            emb = await compute_embeddings_resilient_async(unique_inputs[start:end], api_key, progress_callback)
         print(f"[async] done input slice {start}:{end}")
-        sim = cosine_similarity(emb, target_embeddings)
-        batch_matches: List[str] = []
-        batch_scores: List[float] = []
-        for row in sim:
-            idx = int(np.argmax(row))
-            batch_matches.append(target_list[idx])
-            batch_scores.append(float(row[idx]))
-        results_match[start] = batch_matches
-        results_score[start] = batch_scores
+        # Keep only the scoring layout while waiting for targets; the raw float32
+        # batch is dropped here and only (index, score) per row outlives the worker
+        query = encode_for_scoring(emb)
+        del emb
+        target_matrix, target_index, use_prefilter, components, target_reduced = await targets_task
+        if components is not None:
+            best_idx, best_scores = projected_best_match(
+                query, target_matrix, project_rows(query, components), target_reduced, target_index,
+            )
+        elif use_prefilter:
+            best_idx, best_scores = prefiltered_best_match(
+                query, target_matrix,
+                unique_inputs[start:end], unique_targets, FUZZY_PREFILTER_TOP_M,
+            )
+        else:
+            best_idx, best_scores = best_match(query, target_matrix, target_index)
+        del query
+        best_idx_all[start:end] = best_idx
+        best_score_all[start:end] = best_scores
         completed += 1
         if progress_callback:
             pct = int((completed / total_batches) * 100)
             progress_callback(f"Matching: {pct}% ({completed}/{total_batches})")
 
-    await asyncio.gather(*(worker(s, e) for (s, e) in input_slices))
-
-    matches: List[str] = []
-    scores: List[float] = []
-    for start in sorted(results_match.keys()):
-        matches.extend(results_match[start])
-        scores.extend(results_score[start])
+    try:
+        await asyncio.gather(*(worker(s, e) for (s, e) in input_slices))
+        await targets_task  # surfaces target errors even when there are no inputs
+    finally:
+        if not targets_task.done():
+            targets_task.cancel()
+
+    inverse_idx = np.asarray(inverse, dtype=np.int64)
+    matches = [target_list[i] for i in target_rows[best_idx_all[inverse_idx]].tolist()]
+    scores = best_score_all[inverse_idx].astype(np.float64).tolist()
     if progress_callback:
         progress_callback("Finalizing results...")
     return {"match": matches, "score": scores}
 
-def get_sample_data() -> Tuple[pd.DataFrame, pd.DataFrame]:
-    """Get sample datasets for demonstration"""
+def read_csv_file(path: str) -> pd.DataFrame:
+    """Parse an uploaded CSV, using pyarrow's multithreaded reader when installed."""
+    if PYARROW_AVAILABLE:
+        try:
+            return pd.read_csv(path, engine="pyarrow")
+        except Exception:
+            pass  # fall back to the C parser for anything pyarrow rejects
+    return pd.read_csv(path)
+
+def iter_csv_chunks(df: pd.DataFrame, chunk_rows: int = 5000):
+    """Yield a DataFrame as CSV text a block of rows at a time (header first).
+
+    Download handlers stream these chunks, so the full CSV string and its
+    encoded copy are never held in memory at once. The joined chunks are
+    exactly df.to_csv(index=False).
+    """
+    if df.empty:
+        yield df.to_csv(index=False)
+        return
+    # pandas picks a datetime column's format from the rows it writes (date-only when all are
+    # midnight), so format those columns once over the whole frame to keep every chunk alike
+    time_cols = [
+        col for col in df.columns
+        if pd.api.types.is_datetime64_any_dtype(df[col]) or pd.api.types.is_timedelta64_dtype(df[col])
+    ]
+    if time_cols:
+        df = df.copy(deep=False)
+        for col in time_cols:
+            df[col] = df[col].astype(str).where(df[col].notna(), None)
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(index=False, header=(start == 0))
+
+RESULTS_PAGE_SIZE = 50
+
+def summarize_results(df: pd.DataFrame) -> dict:
+    """Match counts and mean matched score for a results frame."""
+    total = len(df)
+    # run_matching writes the status column as exactly 'NO MATCH' / 'Match'
+    no_match = (df['status'] == 'NO MATCH').to_numpy() if 'status' in df.columns else np.zeros(total, dtype=bool)
+    no_matches = int(no_match.sum())
+    avg_score = df.loc[~no_match, 'similarity_score'].mean() if 'similarity_score' in df.columns else None
+    return {
+        "total": total,
+        "no_matches": no_matches,
+        "successful": total - no_matches,
+        "avg_score_str": f"{avg_score:.3f}" if avg_score is not None and not pd.isna(avg_score) else "N/A",
+    }
+
+def contains_mask(values: pd.Series, term: str) -> np.ndarray:
+    """Case-insensitive literal substring mask; text columns go through Arrow's string kernel."""
+    if PYARROW_AVAILABLE and values.dtype == object:
+        try:
+            arr = pyarrow.array(values, from_pandas=True)
+        except (pyarrow.ArrowException, TypeError, ValueError):
+            arr = None
+        if arr is not None and pyarrow.types.is_string(arr.type):
+            hits = pc.match_substring(arr, term, ignore_case=True)
+            return pc.fill_null(hits, False).to_numpy(zero_copy_only=False)
+    return values.astype(str).str.contains(term, case=False, regex=False, na=False).to_numpy()
+
+def binned_gaussian_kde(values: np.ndarray, grid: np.ndarray, bins: int = 2048) -> np.ndarray:
+    """Gaussian KDE (Scott's bandwidth, as scipy's gaussian_kde) evaluated on `grid`.
+
+    Bins the data first and convolves the counts with the kernel, so the cost is
+    O(n + bins * kernel width) instead of O(n * len(grid)).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    bw = values.std(ddof=1) * n ** (-1 / 5) if n > 1 else 0.0
+    lo = min(values.min(), grid.min())
+    hi = max(values.max(), grid.max())
+    dx = (hi - lo) / bins if hi > lo else 1.0 / bins
+    bw = max(bw, dx)  # all-equal scores: fall back to a one-bin-wide spike
+    pad = int(np.ceil(4 * bw / dx))
+    edges = lo - pad * dx + dx * np.arange(bins + 2 * pad + 1)
+    counts, _ = np.histogram(values, bins=edges)
+    offsets = dx * np.arange(-pad, pad + 1)
+    kernel = np.exp(-0.5 * (offsets / bw) ** 2) / (bw * np.sqrt(2 * np.pi) * n)
+    density = np.convolve(counts, kernel, mode="same")
+    centers = (edges[:-1] + edges[1:]) / 2
+    return np.interp(grid, centers, density)
+
+# Point-per-row traces (rug, scatter) are thinned to this many markers
+PLOT_MAX_POINTS = 5000
+
+def plot_sample_positions(n: int, limit: int = PLOT_MAX_POINTS) -> np.ndarray:
+    """Row positions to draw: all of them, or a fixed-seed uniform sample kept in row order."""
+    if n <= limit:
+        return np.arange(n)
+    return np.sort(np.random.default_rng(0).choice(n, limit, replace=False))
+
+THRESHOLD_MARKER = "threshold-line"
+
+def threshold_marker(threshold: float) -> Tuple[dict, dict]:
+    """Dashed vertical threshold line and its label, named so they can be found and replaced."""
+    shape = dict(
+        name=THRESHOLD_MARKER, type="line", x0=threshold, x1=threshold, xref="x",
+        y0=0, y1=1, yref="y domain", line=dict(color="red", dash="dash"),
+    )
+    label = dict(
+        name=THRESHOLD_MARKER, text=f"Threshold: {threshold:.2f}", showarrow=False,
+        x=threshold, xref="x", xanchor="center", y=1, yref="y domain", yanchor="bottom",
+    )
+    return shape, label
+
+def filter_sort_results(df: pd.DataFrame, sorters: List[dict], filters: List[dict]) -> pd.DataFrame:
+    """Apply Tabulator's remote header filters ("like": case-insensitive substring) and sorters.
+
+    Sorters arrive in priority order; unknown fields are ignored.
+    """
+    for f in filters or []:
+        field, value = f.get("field"), f.get("value")
+        if field in df.columns and value not in (None, ""):
+            df = df[contains_mask(df[field], str(value))]
+    sorters = [s for s in (sorters or []) if s.get("field") in df.columns]
+    if sorters:
+        df = df.sort_values(
+            by=[s["field"] for s in sorters],
+            ascending=[s.get("dir") != "desc" for s in sorters],
+            kind="stable",
+        )
+    return df
+
+@lru_cache(maxsize=1)
+def _sample_frames() -> Tuple[pd.DataFrame, pd.DataFrame]:
     # Sample input data
     input_data = pd.DataFrame({
         "id": range(1, 26),
@@ -1794,6 +1628,11 @@ def get_sample_data() -> Tuple[pd.DataFrame, pd.DataFrame]:
     
     return input_data, target_data
 
+def get_sample_data() -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Get sample datasets for demonstration (built once; each caller gets its own copies)"""
+    input_data, target_data = _sample_frames()
+    return input_data.copy(), target_data.copy()
+
 # Create Shiny app with modern theme
 ''' LEGACY LAYOUT (disabled)
 app_ui = ui.page_sidebar(
@@ -1809,9 +1648,9 @@ app_ui = ui.page_sidebar(
         ui.hr(),
         ui.h5("Upload Data"),
         ui.input_file("input_file", "Input CSV", accept=[".csv"], multiple=False),
-        ui.div(id="input_status", class_="mt-2"),
+        ui.div(id="input_status", class_="mt-2 upload-status"),
         ui.input_file("target_file", "Target CSV", accept=[".csv"], multiple=False),
-        ui.div(id="target_status", class_="mt-2"),
+        ui.div(id="target_status", class_="mt-2 upload-status"),
         ui.hr(),
         ui.output_ui("sidebar_results_summary_block"),
         open="open",
@@ -1821,7 +1660,7 @@ app_ui = ui.page_sidebar(
         ui.tags.link(rel="stylesheet", href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700;800&display=swap"),
         ui.tags.link(rel="stylesheet", href="https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.0/font/bootstrap-icons.css"),
         ui.tags.link(rel="stylesheet", href="https://unpkg.com/tabulator-tables@5.5.2/dist/css/tabulator.min.css"),
-        ui.tags.style(custom_css_min),
+        stylesheet_head(),
         ui.tags.script(src="https://unpkg.com/tabulator-tables@5.5.2/dist/js/tabulator.min.js"),
         # JavaScript for tooltips and table features
         ui.tags.script("""
@@ -2117,9 +1956,9 @@ def make_sidebar():
             )
         ),
         ui.input_file("input_file", "Input CSV", accept=[".csv"], multiple=False),
-        ui.div(id="input_status", class_="mt-2"),
+        ui.div(id="input_status", class_="mt-2 upload-status"),
         ui.input_file("target_file", "Target CSV", accept=[".csv"], multiple=False),
-        ui.div(id="target_status", class_="mt-2"),
+        ui.div(id="target_status", class_="mt-2 upload-status"),
         # Add sample data button for easier mobile access
         ui.div(
             ui.input_action_button(
@@ -2156,7 +1995,7 @@ app_ui = ui.page_navbar(
         "Semantic Embedder",
         ui.page_sidebar(
             make_sidebar(),
-            ui.tags.style(custom_css_min),
+            stylesheet_head(),
             ui.navset_tab(
                 ui.nav_panel(
                     "Tutorial",
@@ -2228,7 +2067,7 @@ app_ui = ui.page_navbar(
                                 ui.div(
                                     ui.output_data_frame("input_col_preview"),
                                     id="input_preview_wrap",
-                                    style="margin: 0 !important; padding: 0 !important; text-align: left !important; width: 100% !important;"
+                                    class_="preview-col",
                                 )
                             ),
                             ui.column(6,
@@ -2237,7 +2076,7 @@ app_ui = ui.page_navbar(
                                 ui.div(
                                     ui.output_data_frame("target_col_preview"),
                                     id="target_preview_wrap",
-                                    style="margin: 0 !important; padding: 0 !important; text-align: left !important; width: 100% !important;"
+                                    class_="preview-col",
                                 )
                             )
                         ),
@@ -2390,59 +2229,78 @@ app_ui = ui.page_navbar(
             # JS helpers for Step 1 preview layout and narrow first column
             ui.tags.script("""
               (function(){
-                // Initialize Bootstrap tooltips on demand
-                function initTooltips(){
-                  if (window.bootstrap && bootstrap.Tooltip) {
-                    document.querySelectorAll('[data-bs-toggle="tooltip"]').forEach(function(el){
-                      try { new bootstrap.Tooltip(el, {container:'body'}); } catch(e){}
-                    });
-                  }
+                // Selectors used on every update, defined once
+                var SEL_TOOLTIP = '[data-bs-toggle="tooltip"]:not([data-tt-bound])';
+                var SEL_GRID_TABLE = '.gridjs-table';
+                // Initialize Bootstrap tooltips once per element; bound elements are
+                // marked so repeat passes skip them instead of stacking instances
+                function initTooltips(scope){
+                  if (!(window.bootstrap && bootstrap.Tooltip)) return;
+                  (scope || document).querySelectorAll(SEL_TOOLTIP).forEach(function(el){
+                    el.setAttribute('data-tt-bound', '1');
+                    try { new bootstrap.Tooltip(el, {container:'body'}); } catch(e){}
+                  });
                 }
-                document.addEventListener('DOMContentLoaded', initTooltips);
-                document.addEventListener('shiny:value', initTooltips);
+                document.addEventListener('DOMContentLoaded', function(){ initTooltips(document); });
+                // shiny:value fires before the output renders; defer, then scan only that output
+                document.addEventListener('shiny:value', function(ev){
+                  var target = ev.target;
+                  setTimeout(function(){ initTooltips(target && target.isConnected ? target : document); }, 0);
+                });
                 // Threshold value badge removed; rely on slider only
+                // Container and table sizing lives in the stylesheet (.preview-col rules);
+                // the script only tags first-column cells.
+                var PREVIEW_IDS = ['input_col_preview', 'target_col_preview'];
+                // Output containers are stable across updates; the grid table is rebuilt
+                // on re-render, so both caches are revalidated with isConnected.
+                var rootCache = {};
+                function previewRoot(id){
+                  var root = rootCache[id];
+                  if (!root || !root.isConnected) root = rootCache[id] = document.getElementById(id);
+                  return root;
+                }
                 function adjustPreview(id){
-                  var root = document.getElementById(id);
+                  var root = previewRoot(id);
                   if(!root) return;
-                  // Ensure containers don't center and take full width
-                  var containers = root.querySelectorAll('.shiny-data-frame, .html-fill-container, .html-fill-item, .gridjs-container, .gridjs-wrapper');
-                  containers.forEach(function(el){
-                    try {
-                      el.style.marginLeft = '0';
-                      el.style.marginRight = '0';
-                      el.style.width = '100%';
-                      el.style.maxWidth = 'none';
-                    } catch(e){}
-                  });
-                  var table = root.querySelector('.gridjs-table');
-                  if(!table) return;
-                  table.style.width = '100%';
-                  table.style.tableLayout = 'auto';
-                  // Force first column narrow across header and body (Grid.js)
-                  var th0 = table.querySelector('thead.gridjs-thead th.gridjs-th:first-child');
-                  if (th0) {
-                    th0.style.setProperty('width','36px','important');
-                    th0.style.setProperty('min-width','36px','important');
-                    th0.style.setProperty('max-width','40px','important');
-                    th0.style.setProperty('white-space','nowrap','important');
-                    th0.style.setProperty('text-align','center','important');
+                  refreshPreview(root);
+                  observePreview(root);
+                }
+                // Single lookup path for the initial pass and the mutation observer
+                function refreshPreview(root){
+                  var table = root._gridTable;
+                  if (!table || !table.isConnected) table = root._gridTable = root.querySelector(SEL_GRID_TABLE);
+                  if (table) tagFirstColumn(table);
+                }
+                // Tag first-column cells so the stylesheet can key on a class
+                // instead of testing every th/td against :first-child.
+                // Walks the live table.rows / row.cells collections (header and body)
+                // rather than building a NodeList from a selector.
+                function tagFirstColumn(table){
+                  var rows = table.rows;
+                  for (var i = 0; i < rows.length; i++){
+                    var cell = rows[i].cells[0];
+                    if (cell && !cell.classList.contains('gridjs-firstcol')) {
+                      cell.classList.add('gridjs-firstcol');
+                    }
                   }
-                  table.querySelectorAll('tbody.gridjs-tbody td.gridjs-td:first-child').forEach(function(td){
-                    td.style.setProperty('width','36px','important');
-                    td.style.setProperty('min-width','36px','important');
-                    td.style.setProperty('max-width','40px','important');
-                    td.style.setProperty('white-space','nowrap','important');
-                    td.style.setProperty('text-align','center','important');
+                }
+                // Re-tag when Grid.js mounts or re-renders rows (new data, sorting, paging).
+                // Scoped to the preview subtree, so unrelated Shiny outputs never wake it.
+                function observePreview(root){
+                  if (root._firstColObserver || !window.MutationObserver) return;
+                  var pending = false;
+                  root._firstColObserver = new MutationObserver(function(){
+                    if (pending) return;
+                    pending = true;
+                    requestAnimationFrame(function(){
+                      pending = false;
+                      refreshPreview(root);
+                    });
                   });
+                  root._firstColObserver.observe(root, {childList: true, subtree: true});
                 }
-                document.addEventListener('shiny:value', function(ev){
-                  if (ev.detail && (ev.detail.name === 'input_col_preview' || ev.detail.name === 'target_col_preview')){
-                    setTimeout(function(){ adjustPreview(ev.detail.name); }, 0);
-                  }
-                });
                 document.addEventListener('DOMContentLoaded', function(){
-                  adjustPreview('input_col_preview');
-                  adjustPreview('target_col_preview');
+                  PREVIEW_IDS.forEach(adjustPreview);
                 });
               })();
             """),
@@ -2740,18 +2598,236 @@ def create_score_bar(score: float, width: int = 12, min_scale: float = 0.5) -> s
     
     return "█" * filled + "░" * (width - filled)
 
-def create_status_badge(value: str) -> str:
-    """Create HTML status badge based on match status"""
-    if str(value).upper() == "NO MATCH":
-        return '<span class="status-badge status-warn">NO MATCH</span>'
-    else:
-        return '<span class="status-badge status-ok">Match</span>'
+def create_score_bars(scores: pd.Series, width: int = 12, min_scale: float = 0.5) -> np.ndarray:
+    """Vectorized create_score_bar for a whole score column."""
+    values = pd.to_numeric(scores, errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+    scaled = np.clip((values - min_scale) / (1.0 - min_scale), 0.0, 1.0)
+    filled = np.where(values < min_scale, 0, np.rint(scaled * width)).astype(np.int64)
+    bars = np.array(["█" * n + "░" * (width - n) for n in range(width + 1)], dtype=object)
+    return bars[filled]
+
+def _placeholder_figure(message: str) -> go.Figure:
+    """Blank chart with a centered message, for when there is nothing to plot."""
+    fig = go.Figure()
+    fig.add_annotation(
+        text=message,
+        xref="paper", yref="paper",
+        x=0.5, y=0.5,
+        showarrow=False,
+        font=dict(size=14, color="#666")
+    )
+    fig.update_layout(
+        xaxis=dict(visible=False),
+        yaxis=dict(visible=False),
+        height=400
+    )
+    return fig
+
+_FIG_NO_RESULTS = _placeholder_figure("Run mapping to view interactive charts")
+_FIG_NO_SCORES = _placeholder_figure("No similarity scores available")
+
+# Static modal trees, built once at import and shown per session
+_SPLASH_MODAL = ui.modal(
+    ui.div(
+        # Header
+        ui.h2("FoodMapper", class_="text-center mb-2"),
+        ui.p(
+            "Research Tool for Dietary Data Mapping",
+            class_="text-center text-muted mb-4"
+        ),
+        ui.hr(),
+
+        # Research Paper Section
+        ui.div(
+            ui.h5(
+                ui.tags.i(class_="bi bi-journal-text me-2"),
+                "Research Publication",
+                class_="mb-3"
+            ),
+            ui.div(
+                ui.p(
+                    "This application was developed as part of ongoing research on automated methods "
+                    "for mapping dietary intake data to food composition databases.",
+                    class_="mb-3"
+                ),
+                ui.div(
+                    ui.p(
+                        ui.strong("Paper Title:"),
+                        ui.br(),
+                        ui.tags.small(
+                            "[Title Placeholder - To Be Updated]",
+                            class_="text-muted"
+                        ),
+                        class_="mb-2"
+                    ),
+                    ui.p(
+                        ui.strong("Authors:"),
+                        ui.br(),
+                        ui.tags.small(
+                            "Lemay DG, Strohmeier MP, Stoker RB, Larke JA, Wilson SMG",
+                            class_="text-muted"
+                        ),
+                        class_="mb-2"
+                    ),
+                    ui.p(
+                        ui.strong("Learn More:"),
+                        ui.br(),
+                        ui.tags.small(
+                            ui.HTML('[<a href="#" target="_blank">Link to paper - Coming Soon</a>]'),
+                            class_="text-muted"
+                        ),
+                        class_="mb-2"
+                    ),
+                    ui.p(
+                        ui.HTML('<a href="https://github.com/RichardStoker-USDA/Food-Mapper" target="_blank" class="text-decoration-none text-muted"><i class="bi bi-github"></i> View on GitHub</a>'),
+                        class_="mb-3 small"
+                    ),
+                    class_="ms-3 border-start ps-3"
+                )
+            ),
+            class_="mb-4"
+        ),
+
+        # How It Works Section
+        ui.div(
+            ui.h5(
+                ui.tags.i(class_="bi bi-info-circle me-2"),
+                "How It Works",
+                class_="mb-3"
+            ),
+            ui.p(
+                "FoodMapper uses the GTE-Large neural embedding model to understand the meaning "
+                "behind food descriptions. This enables accurate matching even when foods are described "
+                "differently across databases.",
+                class_="small mb-2"
+            ),
+            ui.p(
+                "Traditional manual mapping takes ~28 minutes per food item. "
+                "This tool automates the process, handling thousands of items in minutes.",
+                class_="small text-muted"
+            ),
+            class_="mb-4"
+        ),
+
+        # Disclaimer
+        ui.div(
+            ui.hr(),
+            ui.p(
+                ui.tags.i(class_="bi bi-exclamation-triangle me-1"),
+                ui.strong("Research Tool Disclaimer"),
+                class_="text-center mb-2"
+            ),
+            ui.p(
+                "This application is a research tool intended for scientific use in nutritional and dietary studies. "
+                "Results should be validated by domain experts. For research purposes only.",
+                class_="small text-muted text-center"
+            ),
+            class_="mt-3"
+        ),
+
+        # Get Started Button
+        ui.div(
+            ui.input_action_button(
+                "close_splash", 
+                "Get Started", 
+                class_="btn btn-primary btn-lg"
+            ),
+            class_="text-center mt-4"
+        ),
+        class_="p-4"
+    ),
+    title="",
+    footer=None,
+    size="m",
+    easy_close=True,
+    fade=True
+)
+
+_UPLOAD_HELP_MODAL = ui.modal(
+    ui.div(
+        ui.h4("Upload Requirements", class_="mb-3"),
+        ui.hr(),
+        ui.h6("File Format"),
+        ui.tags.ul(
+            ui.tags.li("CSV format (.csv) required"),
+            ui.tags.li("Include headers in first row"),
+            ui.tags.li("UTF-8 encoding recommended")
+        ),
+        ui.h6("Input File", class_="mt-3"),
+        ui.p("Items you want to match (one per row)", class_="text-muted"),
+        ui.h6("Target File", class_="mt-3"),
+        ui.p("Reference database to match against", class_="text-muted"),
+        ui.hr(),
+        ui.p(
+            ui.tags.small(
+                "Need help? ",
+                ui.input_action_link("close_help_goto_tutorial", "View tutorial", class_="text-primary"),
+                class_="text-muted"
+            )
+        ),
+        class_="p-2"
+    ),
+    footer=ui.input_action_button("close_upload_help", "Got it", class_="btn btn-primary"),
+    easy_close=True,
+    size="m",
+    title=""
+)
+
+_REQUIREMENTS_MODAL = ui.modal(
+    ui.div(
+        ui.h4("Data Requirements", class_="mb-3"),
+        ui.hr(),
+        ui.h6("File Format"),
+        ui.tags.ul(
+            ui.tags.li("Files must be in CSV format (.csv)"),
+            ui.tags.li("Must include column headers in first row"),
+            ui.tags.li("UTF-8 encoding recommended")
+        ),
+        ui.h6("Input File", class_="mt-3"),
+        ui.p("Contains the items you want to match. Each row represents one item to find a match for.", class_="text-muted"),
+        ui.h6("Target File", class_="mt-3"),
+        ui.p("Contains the reference dataset. The system will find the best match from this list for each input item.", class_="text-muted"),
+        ui.h6("Best Practices", class_="mt-3"),
+        ui.tags.ul(
+            ui.tags.li("Choose columns with descriptive text for best semantic matching"),
+            ui.tags.li("Remove or clean special characters if needed"),
+            ui.tags.li("Longer descriptions generally produce better matches")
+        ),
+        class_="p-2"
+    ),
+    footer=ui.input_action_button("close_req", "Got it", class_="btn btn-primary"),
+    easy_close=True,
+    size="m",
+    title=""
+)
+
+# Sidebar navigation button variants (static; sidebar_navigation_button picks one per render)
+def _sidebar_next_button(label: str, class_: str = "btn btn-primary w-100", disabled: bool = False):
+    return ui.input_action_button(
+        "sidebar_next",
+        ui.span(ui.tags.i(class_="bi bi-arrow-right-circle-fill me-2"), label),
+        class_=class_,
+        disabled=disabled,
+    )
+
+_BTN_CONFIG_ENABLED = _sidebar_next_button("Next: Configure Data")
+_BTN_CONFIG_DISABLED = _sidebar_next_button("Next: Configure Data", disabled=True)
+_BTN_RESULTS_ENABLED = _sidebar_next_button("Next: View Results")
+_BTN_RESULTS_DISABLED = _sidebar_next_button("Next: View Results", class_="btn btn-primary w-100 disabled", disabled=True)
+_BTN_RESET = ui.input_action_button(
+    "sidebar_reset",
+    ui.span(ui.tags.i(class_="bi bi-arrow-counterclockwise me-2"), "Start New Mapping"),
+    class_="btn btn-primary w-100"
+)
+
+# Shared "nothing loaded" sentinel for the data slots; never mutated (every consumer checks .empty first)
+EMPTY_FRAME = pd.DataFrame()
 
 def server(input: Inputs, output: Outputs, session: Session):
     # Reactive values for data storage
-    input_df = reactive.value(pd.DataFrame())
-    target_df = reactive.value(pd.DataFrame())
-    results_df = reactive.value(pd.DataFrame())
+    input_df = reactive.value(EMPTY_FRAME)
+    target_df = reactive.value(EMPTY_FRAME)
+    results_df = reactive.value(EMPTY_FRAME)
     current_step = reactive.value(1)
     progress_message = reactive.value("Starting...")
     # State for optional centered overlay (currently returns None by default)
@@ -2761,129 +2837,8 @@ def server(input: Inputs, output: Outputs, session: Session):
     # Show welcome splash screen on app load (controlled by environment variable)
     @reactive.effect
     def show_splash():
-        # Check environment variable to control splash screen visibility
-        # HIDE_SPLASH_SCREEN: Set to "true" or "1" to hide the splash screen
-        # Default behavior is to show the splash screen if variable is not set
-        hide_splash = os.environ.get("HIDE_SPLASH_SCREEN", "").lower() in ["true", "1", "yes"]
-        
-        if not hide_splash:
-            ui.modal_show(
-                ui.modal(
-                    ui.div(
-                        # Header
-                        ui.h2("FoodMapper", class_="text-center mb-2"),
-                        ui.p(
-                            "Research Tool for Dietary Data Mapping",
-                            class_="text-center text-muted mb-4"
-                        ),
-                        ui.hr(),
-                        
-                        # Research Paper Section
-                        ui.div(
-                            ui.h5(
-                                ui.tags.i(class_="bi bi-journal-text me-2"),
-                                "Research Publication",
-                                class_="mb-3"
-                            ),
-                            ui.div(
-                                ui.p(
-                                    "This application was developed as part of ongoing research on automated methods "
-                                    "for mapping dietary intake data to food composition databases.",
-                                    class_="mb-3"
-                                ),
-                                ui.div(
-                                    ui.p(
-                                        ui.strong("Paper Title:"),
-                                        ui.br(),
-                                        ui.tags.small(
-                                            "[Title Placeholder - To Be Updated]",
-                                            class_="text-muted"
-                                        ),
-                                        class_="mb-2"
-                                    ),
-                                    ui.p(
-                                        ui.strong("Authors:"),
-                                        ui.br(),
-                                        ui.tags.small(
-                                            "Lemay DG, Strohmeier MP, Stoker RB, Larke JA, Wilson SMG",
-                                            class_="text-muted"
-                                        ),
-                                        class_="mb-2"
-                                    ),
-                                    ui.p(
-                                        ui.strong("Learn More:"),
-                                        ui.br(),
-                                        ui.tags.small(
-                                            ui.HTML('[<a href="#" target="_blank">Link to paper - Coming Soon</a>]'),
-                                            class_="text-muted"
-                                        ),
-                                        class_="mb-2"
-                                    ),
-                                    ui.p(
-                                        ui.HTML('<a href="https://github.com/RichardStoker-USDA/Food-Mapper" target="_blank" class="text-decoration-none text-muted"><i class="bi bi-github"></i> View on GitHub</a>'),
-                                        class_="mb-3 small"
-                                    ),
-                                    class_="ms-3 border-start ps-3"
-                                )
-                            ),
-                            class_="mb-4"
-                        ),
-                        
-                        # How It Works Section
-                        ui.div(
-                            ui.h5(
-                                ui.tags.i(class_="bi bi-info-circle me-2"),
-                                "How It Works",
-                                class_="mb-3"
-                            ),
-                            ui.p(
-                                "FoodMapper uses the GTE-Large neural embedding model to understand the meaning "
-                                "behind food descriptions. This enables accurate matching even when foods are described "
-                                "differently across databases.",
-                                class_="small mb-2"
-                            ),
-                            ui.p(
-                                "Traditional manual mapping takes ~28 minutes per food item. "
-                                "This tool automates the process, handling thousands of items in minutes.",
-                                class_="small text-muted"
-                            ),
-                            class_="mb-4"
-                        ),
-                        
-                        # Disclaimer
-                        ui.div(
-                            ui.hr(),
-                            ui.p(
-                                ui.tags.i(class_="bi bi-exclamation-triangle me-1"),
-                                ui.strong("Research Tool Disclaimer"),
-                                class_="text-center mb-2"
-                            ),
-                            ui.p(
-                                "This application is a research tool intended for scientific use in nutritional and dietary studies. "
-                                "Results should be validated by domain experts. For research purposes only.",
-                                class_="small text-muted text-center"
-                            ),
-                            class_="mt-3"
-                        ),
-                        
-                        # Get Started Button
-                        ui.div(
-                            ui.input_action_button(
-                                "close_splash", 
-                                "Get Started", 
-                                class_="btn btn-primary btn-lg"
-                            ),
-                            class_="text-center mt-4"
-                        ),
-                        class_="p-4"
-                    ),
-                    title="",
-                    footer=None,
-                    size="m",
-                    easy_close=True,
-                    fade=True
-                )
-            )
+        if not HIDE_SPLASH_SCREEN:
+            ui.modal_show(_SPLASH_MODAL)
     
     # Close splash screen handler
     @reactive.effect
@@ -2915,41 +2870,12 @@ def server(input: Inputs, output: Outputs, session: Session):
             in_df = input_df.get()
             tgt_df = target_df.get()
             files_loaded = (not in_df.empty) and (not tgt_df.empty)
-            
-            if files_loaded:
-                return ui.input_action_button(
-                    "sidebar_next", 
-                    ui.span(ui.tags.i(class_="bi bi-arrow-right-circle-fill me-2"), "Next: Configure Data"),
-                    class_="btn btn-primary w-100"
-                )
-            else:
-                return ui.input_action_button(
-                    "sidebar_next", 
-                    ui.span(ui.tags.i(class_="bi bi-arrow-right-circle-fill me-2"), "Next: Configure Data"),
-                    class_="btn btn-primary w-100",
-                    disabled=True
-                )
+            return _BTN_CONFIG_ENABLED if files_loaded else _BTN_CONFIG_DISABLED
         elif current_tab == "Step 1: Data & Configure":
             # Check if results are available
-            if not results_df.get().empty:
-                return ui.input_action_button(
-                    "sidebar_next",
-                    ui.span(ui.tags.i(class_="bi bi-arrow-right-circle-fill me-2"), "Next: View Results"),
-                    class_="btn btn-primary w-100"
-                )
-            else:
-                return ui.input_action_button(
-                    "sidebar_next",
-                    ui.span(ui.tags.i(class_="bi bi-arrow-right-circle-fill me-2"), "Next: View Results"),
-                    class_="btn btn-primary w-100 disabled",
-                    disabled=True
-                )
+            return _BTN_RESULTS_DISABLED if results_df.get().empty else _BTN_RESULTS_ENABLED
         elif current_tab == "Step 2: Results":
-            return ui.input_action_button(
-                "sidebar_reset",
-                ui.span(ui.tags.i(class_="bi bi-arrow-counterclockwise me-2"), "Start New Mapping"),
-                class_="btn btn-primary w-100"
-            )
+            return _BTN_RESET
         else:
             return None
     
@@ -3025,6 +2951,35 @@ def server(input: Inputs, output: Outputs, session: Session):
             duration=3
         )
     
+    # With TARGET_PREWARM=on, embed the selected target column while the user finishes
+    # configuring, so Run finds the target matrix cached (or joins the build still in flight)
+    prewarm_task = {"task": None}
+
+    @reactive.effect
+    def prewarm_targets():
+        tgt_df = target_df.get()
+        tgt_col = input.target_column()
+        clean_target_text = input.clean_target()
+        if (
+            not TARGET_PREWARM_ENABLED
+            or not TARGET_EMBED_CACHE_ENABLED
+            or tgt_df.empty
+            or tgt_col not in tgt_df.columns
+            or MODEL_FALLBACK_MODE == "local"
+            or FALLBACK_ACTIVE
+        ):
+            return
+        api_key = get_api_key()
+        if not api_key:
+            return
+        unique_targets, _ = distinct_embedding_targets(unique_target_values(), clean_target_text)
+        previous = prewarm_task["task"]
+        if previous is not None and not previous.done():
+            previous.cancel()  # only abandons the wait/join; a shared build keeps running
+        prewarm_task["task"] = asyncio.create_task(
+            prewarm_target_embeddings(unique_targets, api_key, delay=TARGET_PREWARM_DELAY_SECS)
+        )
+
     # Load sample data from tutorial page
     @reactive.effect
     @reactive.event(input.load_sample)
@@ -3073,37 +3028,7 @@ def server(input: Inputs, output: Outputs, session: Session):
     @reactive.effect
     @reactive.event(input.show_upload_help)
     def show_upload_help_modal():
-        ui.modal_show(
-            ui.modal(
-                ui.div(
-                    ui.h4("Upload Requirements", class_="mb-3"),
-                    ui.hr(),
-                    ui.h6("File Format"),
-                    ui.tags.ul(
-                        ui.tags.li("CSV format (.csv) required"),
-                        ui.tags.li("Include headers in first row"),
-                        ui.tags.li("UTF-8 encoding recommended")
-                    ),
-                    ui.h6("Input File", class_="mt-3"),
-                    ui.p("Items you want to match (one per row)", class_="text-muted"),
-                    ui.h6("Target File", class_="mt-3"),
-                    ui.p("Reference database to match against", class_="text-muted"),
-                    ui.hr(),
-                    ui.p(
-                        ui.tags.small(
-                            "Need help? ",
-                            ui.input_action_link("close_help_goto_tutorial", "View tutorial", class_="text-primary"),
-                            class_="text-muted"
-                        )
-                    ),
-                    class_="p-2"
-                ),
-                footer=ui.input_action_button("close_upload_help", "Got it", class_="btn btn-primary"),
-                easy_close=True,
-                size="m",
-                title=""
-            )
-        )
+        ui.modal_show(_UPLOAD_HELP_MODAL)
     
     # Close upload help modal
     @reactive.effect
@@ -3123,35 +3048,7 @@ def server(input: Inputs, output: Outputs, session: Session):
     @reactive.effect
     @reactive.event(input.show_requirements)
     def show_data_requirements_modal():
-        ui.modal_show(
-            ui.modal(
-                ui.div(
-                    ui.h4("Data Requirements", class_="mb-3"),
-                    ui.hr(),
-                    ui.h6("File Format"),
-                    ui.tags.ul(
-                        ui.tags.li("Files must be in CSV format (.csv)"),
-                        ui.tags.li("Must include column headers in first row"),
-                        ui.tags.li("UTF-8 encoding recommended")
-                    ),
-                    ui.h6("Input File", class_="mt-3"),
-                    ui.p("Contains the items you want to match. Each row represents one item to find a match for.", class_="text-muted"),
-                    ui.h6("Target File", class_="mt-3"),
-                    ui.p("Contains the reference dataset. The system will find the best match from this list for each input item.", class_="text-muted"),
-                    ui.h6("Best Practices", class_="mt-3"),
-                    ui.tags.ul(
-                        ui.tags.li("Choose columns with descriptive text for best semantic matching"),
-                        ui.tags.li("Remove or clean special characters if needed"),
-                        ui.tags.li("Longer descriptions generally produce better matches")
-                    ),
-                    class_="p-2"
-                ),
-                footer=ui.input_action_button("close_req", "Got it", class_="btn btn-primary"),
-                easy_close=True,
-                size="m",
-                title=""
-            )
-        )
+        ui.modal_show(_REQUIREMENTS_MODAL)
 
     # Close Data Requirements modal
     @reactive.effect
@@ -3162,10 +3059,10 @@ def server(input: Inputs, output: Outputs, session: Session):
     # Handle file uploads
     @reactive.effect
     @reactive.event(input.input_file)
-    def handle_input_file():
+    async def handle_input_file():
         file: list[FileInfo] | None = input.input_file()
         if file and len(file) > 0:
-            df = pd.read_csv(file[0]["datapath"])
+            df = await run_blocking(read_csv_file, file[0]["datapath"])
             input_df.set(df)
             
             # Update column choices
@@ -3182,7 +3079,8 @@ def server(input: Inputs, output: Outputs, session: Session):
                 ui.div(
                     ui.p(f"Loaded {len(df):,} inputs",
                          class_="alert alert-success alert-animated"),
-                    id="input_file_status"
+                    id="input_file_status",
+                    class_="file-status"
                 ),
                 selector="#input_status",
                 where="afterEnd"
@@ -3195,10 +3093,10 @@ def server(input: Inputs, output: Outputs, session: Session):
 
     @reactive.effect
     @reactive.event(input.target_file)
-    def handle_target_file():
+    async def handle_target_file():
         file: list[FileInfo] | None = input.target_file()
         if file and len(file) > 0:
-            df = pd.read_csv(file[0]["datapath"])
+            df = await run_blocking(read_csv_file, file[0]["datapath"])
             target_df.set(df)
             
             # Update column choices
@@ -3215,7 +3113,8 @@ def server(input: Inputs, output: Outputs, session: Session):
                 ui.div(
                     ui.p(f"Loaded {len(df):,} targets",
                          class_="alert alert-success alert-animated"),
-                    id="target_file_status"
+                    id="target_file_status",
+                    class_="file-status"
                 ),
                 selector="#target_status",
                 where="afterEnd"
@@ -3239,29 +3138,36 @@ def server(input: Inputs, output: Outputs, session: Session):
             return df.head(5)
         return pd.DataFrame()
     
+    PREVIEW_ROWS = 5
+
+    def column_preview(df: pd.DataFrame, col: str, clean: bool):
+        """First non-empty values of one column, optionally with their cleaned form."""
+        series = df[col]
+        # Scan a short head first; only fall back to the whole column when it is mostly empty
+        sample_values = series.head(PREVIEW_ROWS * 10).dropna().head(PREVIEW_ROWS).tolist()
+        if len(sample_values) < PREVIEW_ROWS and len(series) > PREVIEW_ROWS * 10:
+            sample_values = series.dropna().head(PREVIEW_ROWS).tolist()
+        rows = range(1, len(sample_values) + 1)
+        if clean:
+            preview_df = pd.DataFrame({
+                "Row": rows,
+                "Original": sample_values,
+                "After Cleaning": clean_text_simple(sample_values)
+            })
+        else:
+            preview_df = pd.DataFrame({
+                "Row": rows,
+                "Sample Values": sample_values
+            })
+        # Use Shiny DataGrid (theme-aware, interactive)
+        return render.DataGrid(preview_df)
+
     @render.data_frame
     def input_col_preview():
         df = input_df.get()
         col = input.input_column()
         if not df.empty and col and col in df.columns:
-            sample_values = df[col].dropna().head(5).tolist()
-            
-            # Apply text cleaning if toggle is on
-            if input.clean_input():
-                original_values = sample_values.copy()
-                cleaned_values = clean_text_simple(sample_values)
-                preview_df = pd.DataFrame({
-                    "Row": range(1, len(sample_values) + 1),
-                    "Original": original_values,
-                    "After Cleaning": cleaned_values
-                })
-            else:
-                preview_df = pd.DataFrame({
-                    "Row": range(1, len(sample_values) + 1),
-                    "Sample Values": sample_values
-                })
-            # Use Shiny DataGrid (theme-aware, interactive)
-            return render.DataGrid(preview_df)
+            return column_preview(df, col, input.clean_input())
         return pd.DataFrame()
     
     @render.data_frame
@@ -3269,26 +3175,25 @@ def server(input: Inputs, output: Outputs, session: Session):
         df = target_df.get()
         col = input.target_column()
         if not df.empty and col and col in df.columns:
-            sample_values = df[col].dropna().head(5).tolist()
-            
-            # Apply text cleaning if toggle is on
-            if input.clean_target():
-                original_values = sample_values.copy()
-                cleaned_values = clean_text_simple(sample_values)
-                preview_df = pd.DataFrame({
-                    "Row": range(1, len(sample_values) + 1),
-                    "Original": original_values,
-                    "After Cleaning": cleaned_values
-                })
-            else:
-                preview_df = pd.DataFrame({
-                    "Row": range(1, len(sample_values) + 1),
-                    "Sample Values": sample_values
-                })
-            # Use Shiny DataGrid (theme-aware, interactive)
-            return render.DataGrid(preview_df)
+            return column_preview(df, col, input.clean_target())
         return pd.DataFrame()
     
+    # Last readiness sent to the run button, so repeat invalidations don't re-send it
+    run_button_ready = {"ready": None}
+
+    # Column values as Python lists, rebuilt only when the frame or selected column changes.
+    # Callers must not mutate the returned lists.
+    @reactive.calc
+    def input_values():
+        df, col = input_df.get(), input.input_column()
+        return df[col].dropna().tolist() if col in df.columns else []
+
+    @reactive.calc
+    def unique_target_values():
+        df, col = target_df.get(), input.target_column()
+        # pd.unique hashes in C and keeps first-occurrence order, like dict.fromkeys
+        return pd.unique(df[col].dropna().to_numpy()).tolist() if col in df.columns else []
+
     # Helper function to check readiness for running mapping
     def check_files_loaded():
         ready = (not input_df.get().empty) and (not target_df.get().empty)
@@ -3298,7 +3203,9 @@ def server(input: Inputs, output: Outputs, session: Session):
             ready = ready and bool(in_col) and bool(tgt_col)
         except Exception:
             pass
-        ui.update_action_button("run_matching", disabled=(not ready))
+        if run_button_ready["ready"] is not ready:
+            run_button_ready["ready"] = ready
+            ui.update_action_button("run_matching", disabled=(not ready))
 
     # Watch column selection to enable/disable run button
     @reactive.effect
@@ -3334,10 +3241,10 @@ def server(input: Inputs, output: Outputs, session: Session):
     
     def reset_for_new_analysis():
         # Clear results
-        results_df.set(pd.DataFrame())
+        results_df.set(EMPTY_FRAME)
         # Clear input and target datasets and selections
-        input_df.set(pd.DataFrame())
-        target_df.set(pd.DataFrame())
+        input_df.set(EMPTY_FRAME)
+        target_df.set(EMPTY_FRAME)
         ui.update_select("input_column", choices=[], selected=None)
         ui.update_select("target_column", choices=[], selected=None)
         # Disable run button until files and columns are (re)selected
@@ -3355,24 +3262,24 @@ def server(input: Inputs, output: Outputs, session: Session):
         # Return None so nothing is rendered; keep hook for future use
         return None
 
+    # Summary counts for the current results; shared by every sidebar render
+    @reactive.calc
+    def results_summary():
+        df = results_df.get()
+        return None if df.empty else summarize_results(df)
+
     # Sidebar summary block: only show after results exist
     @render.ui
     def sidebar_results_summary_block():
-        df = results_df.get()
-        if df.empty:
+        summary = results_summary()
+        if summary is None:
             return None
-        # derive summary
-        total_inputs = len(df)
-        no_matches = (df.get('status', '').astype(str).str.upper() == 'NO MATCH').sum()
-        successful = total_inputs - no_matches
-        avg_score = df[df.get('status', '').astype(str).str.upper() != 'NO MATCH']['similarity_score'].mean() if 'similarity_score' in df.columns else None
-        avg_score_str = f"{avg_score:.3f}" if avg_score is not None and not pd.isna(avg_score) else "N/A"
         return ui.div(
             ui.h5("Results Summary"),
-            ui.p(f"Total Inputs: {total_inputs}"),
-            ui.p(f"Successful Matches: {successful}"),
-            ui.p(f"No Matches: {no_matches}"),
-            ui.p(f"Average Score: {avg_score_str}"),
+            ui.p(f"Total Inputs: {summary['total']}"),
+            ui.p(f"Successful Matches: {summary['successful']}"),
+            ui.p(f"No Matches: {summary['no_matches']}"),
+            ui.p(f"Average Score: {summary['avg_score_str']}"),
             class_="alert alert-info alert-animated"
         )
     
@@ -3452,20 +3359,18 @@ def server(input: Inputs, output: Outputs, session: Session):
                     )
                 except Exception:
                     pass
-                # Prepare data
-                input_list = in_df[in_col].dropna().tolist()
-                target_list = tgt_df[tgt_col].dropna().tolist()
-                
-                # Remove duplicates from target
-                target_list_unique = list(dict.fromkeys(target_list))
+                # Prepare data (cached per frame/column, so threshold re-runs skip this)
+                input_list = input_values()
+                target_list_unique = unique_target_values()
                 
                 # Apply cleaning to display text if toggles are on
                 # Store both original and cleaned versions
                 input_list_display = clean_text_simple(input_list) if clean_input_text else input_list
                 
+                # sleep(0) just yields so the queued progress message is flushed to the client
                 p.set(10, message="Data Prepared", 
                      detail=f"{len(input_list):,} inputs • {len(target_list_unique):,} targets")
-                await asyncio.sleep(0.1)
+                await asyncio.sleep(0)
                 
                 # Initialize results with potentially cleaned input text for display
                 results = pd.DataFrame({
@@ -3478,7 +3383,7 @@ def server(input: Inputs, output: Outputs, session: Session):
                 current_progress = 10
                 
                 # Run semantic embeddings only
-                effective_batch = min(EMBED_BATCH_SIZE, 1024)
+                effective_batch = current_embed_batch_size()
                 
                 # Check if we'll be using CPU and notify IMMEDIATELY
                 if MODEL_FALLBACK_MODE == "local":
@@ -3503,17 +3408,24 @@ def server(input: Inputs, output: Outputs, session: Session):
                 p.set(current_progress + 5, 
                      message=progress_msg, 
                      detail=f"Processing {len(input_list):,} items")
-                await asyncio.sleep(0.1)
+                await asyncio.sleep(0)
 
                 # Simple progress callback for embedding batches
-                batches_total = ((len(input_list) + effective_batch - 1) // effective_batch) + \
+                n_unique_inputs = len(dict.fromkeys(input_list))
+                batches_total = ((n_unique_inputs + effective_batch - 1) // effective_batch) + \
                                 ((len(target_list_unique) + effective_batch - 1) // effective_batch)
                 batch_num = [0]
+                last_progress_ts = [0.0]
 
                 def progress_callback(msg: str):
                     # Only increment when a batch completes (Embedding batches or Matching)
                     if msg.startswith("Embedding batches:") or msg.startswith("Matching:"):
                         batch_num[0] = min(batch_num[0] + 1, batches_total)
+                        # Count every batch but push at most ~4 UI updates per second
+                        now = time.monotonic()
+                        if now - last_progress_ts[0] < 0.25 and batch_num[0] < batches_total:
+                            return
+                        last_progress_ts[0] = now
                         progress_pct = current_progress + (batch_num[0] / batches_total) * progress_per_method
                         p.set(
                             int(progress_pct),
@@ -3521,24 +3433,14 @@ def server(input: Inputs, output: Outputs, session: Session):
                             detail=f"Batch {batch_num[0]:,} of {batches_total:,}"
                         )
                 
-                if USE_ASYNC:
-                    embed_results = await run_embed_match_async(
-                        input_list,
-                        target_list_unique,
-                        api_key,
-                        progress_callback=progress_callback,
-                        clean_input=clean_input_text,
-                        clean_target=clean_target_text,
-                    )
-                else:
-                    embed_results = run_embed_match(
-                        input_list,
-                        target_list_unique,
-                        api_key,
-                        progress_callback=progress_callback,
-                        clean_input=clean_input_text,
-                        clean_target=clean_target_text,
-                    )
+                embed_results = await run_embed_match_async(
+                    input_list,
+                    target_list_unique,
+                    api_key,
+                    progress_callback=progress_callback,
+                    clean_input=clean_input_text,
+                    clean_target=clean_target_text,
+                )
                 
                 # Apply cleaning to matched target text if toggle is on
                 matched_targets = embed_results['match']
@@ -3547,28 +3449,24 @@ def server(input: Inputs, output: Outputs, session: Session):
                     matched_targets = clean_text_simple(matched_targets)
                 
                 results['best_match'] = matched_targets
-                results['similarity_score'] = embed_results['score']
+                # Round for display while still a float array (the only score column)
+                results['similarity_score'] = np.round(np.asarray(embed_results['score'], dtype=np.float64), 4)
                 # Keep the best match text without decoration for clean exports
                 current_progress += progress_per_method
                 p.set(int(current_progress), message="Embeddings Complete", detail="Processing results...")
-                await asyncio.sleep(0.1)
-                
-                # Round scores for display
-                for col in results.columns:
-                    if 'score' in col:
-                        results[col] = results[col].round(4)
+                await asyncio.sleep(0)
                 
                 # Generate score visualization and status indicators
                 for col in results.columns:
                     if 'score' in col.lower() or 'similarity' in col.lower():
                         bar_col = f"{col}_bar"
-                        results[bar_col] = results[col].apply(create_score_bar)
+                        results[bar_col] = create_score_bars(results[col])
                 
                 # Add match status column based on score threshold
                 if 'best_match' in results.columns:
-                    results.insert(0, 'status', results['similarity_score'].apply(
-                        lambda s: 'NO MATCH' if (pd.notna(s) and float(s) < float(threshold)) else 'Match'
-                    ))
+                    below = results['similarity_score'].to_numpy(dtype=np.float64) < float(threshold)
+                    # Two-valued column: int8 codes instead of one Python string object per row
+                    results.insert(0, 'status', pd.Categorical.from_codes(below.astype(np.int8), categories=['Match', 'NO MATCH']))
                 
                 p.set(95, message="Finalizing", detail="Preparing visualizations...")
                 
@@ -3579,19 +3477,14 @@ def server(input: Inputs, output: Outputs, session: Session):
                 ui.update_navs("workflow_tabs", selected="Step 2: Results")
                 
                 # Generate summary statistics
-                total_inputs = len(results)
-                if 'status' in results.columns:
-                    no_matches = (results['status'] == 'NO MATCH').sum()
-                    successful_matches = total_inputs - no_matches
-                    avg_score = results[results['status'] != 'NO MATCH']['similarity_score'].mean()
-                    avg_score_str = f"{avg_score:.3f}" if not pd.isna(avg_score) else "N/A"
-                else:
-                    no_matches = 0
-                    successful_matches = total_inputs
-                    avg_score_str = "N/A"
+                summary = summarize_results(results)
+                total_inputs = summary['total']
+                no_matches = summary['no_matches']
+                successful_matches = summary['successful']
+                avg_score_str = summary['avg_score_str']
                 
                 p.set(100, message="Complete", detail="Ready to view results")
-                await asyncio.sleep(0.5)
+                await asyncio.sleep(0)
                 
                 # Hide loading spinner
                 try:
@@ -3656,7 +3549,20 @@ def server(input: Inputs, output: Outputs, session: Session):
                 ui.update_action_button("run_matching", disabled=False)
                 raise
     
-    # Filter and display results
+    # Filter and display results for the disabled legacy layout's results_table;
+    # the live results grid is the Tabulator widget, paged and filtered through send_results_page
+    # Search-filtered results; cached so the NO MATCH and sort toggles don't rescan every cell
+    @reactive.calc
+    def search_filtered_results():
+        df = results_df.get()
+        search_term = debounced_search()
+        if not (search_term and search_term.strip()):
+            return df
+        mask = np.zeros(len(df), dtype=bool)
+        for col in df.columns:
+            mask |= contains_mask(df[col], search_term)
+        return df[mask]
+
     @render.table
     def results_table():
         df = results_df.get()
@@ -3668,17 +3574,8 @@ def server(input: Inputs, output: Outputs, session: Session):
         if df.empty:
             return pd.DataFrame()
         
-        # Apply filters
-        filtered_df = df.copy()
-        
-        # Apply search debouncing
-        search_term = debounced_search()
-        if search_term and search_term.strip():
-            mask = filtered_df.apply(
-                lambda row: row.astype(str).str.contains(search_term, case=False, na=False).any(),
-                axis=1
-            )
-            filtered_df = filtered_df[mask]
+        # Apply search (debounced, cached per term)
+        filtered_df = search_filtered_results()
         
         # NO MATCH filter
         if input.show_no_match():
@@ -3693,6 +3590,14 @@ def server(input: Inputs, output: Outputs, session: Session):
 
         return filtered_df
     
+    # Target rows keyed by the selected target column; rebuilt only when either changes
+    @reactive.calc
+    def target_rows_by_key():
+        tgt_col = input.target_column()
+        tgt_df = target_df.get()
+        # drop=False keeps the key as a column, matching the old merge output
+        return tgt_df.drop_duplicates(subset=[tgt_col]).set_index(tgt_col, drop=False).rename_axis(None)
+
     # Export All Data - includes original columns from input and target CSVs
     @render.download(filename=lambda: f"all_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
     def download_all_data():
@@ -3701,7 +3606,8 @@ def server(input: Inputs, output: Outputs, session: Session):
         tgt_df = target_df.get()
         
         if df.empty:
-            return io.BytesIO(b"No results to export")
+            yield "No results to export"
+            return
         
         # Start with the original input dataframe
         export_df = in_df.copy()
@@ -3727,44 +3633,56 @@ def server(input: Inputs, output: Outputs, session: Session):
             # This assumes the target column selected contains unique identifiers
             tgt_col = input.target_column()
             if tgt_col and not tgt_df.empty:
-                # Create a mapping from target description to full target row
-                tgt_df_unique = tgt_df.drop_duplicates(subset=[tgt_col])
-                # Merge based on the matched values
-                merged = export_df.merge(
-                    tgt_df_unique,
-                    left_on='matched_target',
-                    right_on=tgt_col,
-                    how='left',
-                    suffixes=('', '_target')
-                )
-                export_df = merged
+                # Index lookup on the cached keyed frame instead of a fresh merge per click
+                export_df = export_df.join(target_rows_by_key(), on='matched_target', rsuffix='_target')
         
         # Remove UI-only columns like score bars
         bar_cols = [c for c in export_df.columns if c.endswith('_bar')]
         export_df = export_df.drop(columns=bar_cols, errors='ignore')
         
-        return io.BytesIO(export_df.to_csv(index=False).encode())
+        yield from iter_csv_chunks(export_df)
     
     # Export Matches - current functionality (results with mappings)
     @render.download(filename=lambda: f"matches_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
     def download_matches():
         df = results_df.get()
-        if not df.empty:
-            # Remove UI-only columns like score bars
-            export_df = df.copy()
-            bar_cols = [c for c in export_df.columns if c.endswith('_bar')]
-            export_df = export_df.drop(columns=bar_cols, errors='ignore')
-            return io.BytesIO(export_df.to_csv(index=False).encode())
-        return io.BytesIO(b"No results to download")
-
-    # Build interactive grid (Tabulator)
+        if df.empty:
+            yield "No results to download"
+            return
+        # Remove UI-only columns like score bars (drop returns a new frame, no copy needed)
+        bar_cols = [c for c in df.columns if c.endswith('_bar')]
+        yield from iter_csv_chunks(df.drop(columns=bar_cols, errors='ignore'))
+
+    # Filtered/sorted view of the current results; page flips reuse it instead of re-sorting
+    results_view = {"source": None, "key": None, "df": None}
+
+    @reactive.effect
+    @reactive.event(input.results_page_request)
+    async def send_results_page():
+        req = input.results_page_request() or {}
+        df = results_df.get()
+        sorters, filters = req.get("sorters") or [], req.get("filters") or []
+        key = json.dumps([sorters, filters], sort_keys=True)
+        if results_view["source"] is not df or results_view["key"] != key:
+            results_view.update(source=df, key=key, df=filter_sort_results(df, sorters, filters))
+        view = results_view["df"]
+        size = max(1, int(req.get("size") or RESULTS_PAGE_SIZE))
+        last_page = max(1, math.ceil(len(view) / size))
+        page = min(max(1, int(req.get("page") or 1)), last_page)
+        rows = view.iloc[(page - 1) * size:page * size]
+        await session.send_custom_message("results_page", {
+            "id": req.get("id"),
+            "last_page": last_page,
+            # to_json maps NaN to null and numpy scalars to plain JSON
+            "data": json.loads(rows.to_json(orient="records")),
+        })
+
+    # Build interactive grid (Tabulator); rows are fetched a page at a time from send_results_page
     @render.ui
     def results_tabulator():
         df = results_df.get()
         if df.empty:
             return None
-        # Convert DataFrame to records for Tabulator
-        records = df.to_dict(orient='records')
         cols = []
         for c in df.columns:
             col = {"title": c, "field": c}
@@ -3779,7 +3697,6 @@ def server(input: Inputs, output: Outputs, session: Session):
             else:
                 col["headerFilter"] = "input"
             cols.append(col)
-        data_json = json.dumps(records)
         cols_json = json.dumps(cols)
         html = (
             "<div style=\"height:600px\" id=\"tabulator_results\"></div>\n"
@@ -3793,13 +3710,38 @@ def server(input: Inputs, output: Outputs, session: Session):
             "    if(window.Tabulator){ cb(); return; }\n"
             "    var s=document.createElement('script'); s.src='https://unpkg.com/tabulator-tables@5.5.2/dist/js/tabulator.min.js'; s.onload=cb; document.body.appendChild(s);\n"
             "  }\n"
+            "  // One page request in flight per table; replies are matched by id so stale pages are dropped\n"
+            "  var pending = window.__resultsPagePending = window.__resultsPagePending || {};\n"
+            "  if(!window.__resultsPageHandler){\n"
+            "    window.__resultsPageHandler = true;\n"
+            "    Shiny.addCustomMessageHandler('results_page', function(msg){\n"
+            "      var resolve = pending[msg.id];\n"
+            "      if(resolve){ delete pending[msg.id]; resolve({last_page: msg.last_page, data: msg.data}); }\n"
+            "    });\n"
+            "  }\n"
+            "  var seq = 0;\n"
+            "  function requestPage(url, config, params){\n"
+            "    return new Promise(function(resolve){\n"
+            "      var id = 'p' + Date.now() + '_' + (++seq);\n"
+            "      pending[id] = resolve;\n"
+            "      Shiny.setInputValue('results_page_request', {\n"
+            "        id: id, page: params.page, size: params.size,\n"
+            "        sorters: params.sort || [], filters: params.filter || []\n"
+            "      }, {priority: 'event'});\n"
+            "    });\n"
+            "  }\n"
             "  function init(){\n"
             "    var el = document.getElementById('tabulator_results');\n"
             "    if(!el) return;\n"
             "    if (el._tabulator) { el._tabulator.destroy(); }\n"
             "    var table = new Tabulator(el, {\n"
-            "      data: " + data_json + ",\n"
-            "      reactiveData: false,\n"
+            "      ajaxURL: 'shiny:results_page',\n"
+            "      ajaxRequestFunc: requestPage,\n"
+            "      pagination: true,\n"
+            "      paginationMode: 'remote',\n"
+            "      paginationSize: " + str(RESULTS_PAGE_SIZE) + ",\n"
+            "      sortMode: 'remote',\n"
+            "      filterMode: 'remote',\n"
             "      layout: 'fitDataStretch',\n"
             "      height: '600px',\n"
             "      movableColumns: true,\n"
@@ -3808,10 +3750,7 @@ def server(input: Inputs, output: Outputs, session: Session):
             "      columns: " + cols_json + ",\n"
             "      initialSort: [{column: 'similarity_score', dir: 'desc'}],\n"
             "      rowFormatter: function(row){\n"
-            "        var data = row.getData();\n"
-            "        if(data.status === 'NO MATCH'){\n"
-            "          row.getElement().style.backgroundColor = 'rgba(220, 53, 69, 0.08)';\n"
-            "        }\n"
+            "        row.getElement().classList.toggle('no-match-row', row.getData().status === 'NO MATCH');\n"
             "      }\n"
             "    });\n"
             "    el._tabulator = table;\n"
@@ -3846,6 +3785,48 @@ def server(input: Inputs, output: Outputs, session: Session):
             )
         return None
     
+    # Score-derived chart arrays, cached per results frame so switching chart
+    # type or moving the threshold doesn't redo the KDE or the sort
+    @reactive.calc
+    def scored_rows():
+        df = results_df.get()
+        # Only the columns the charts read; one row mask instead of a whole-frame dropna
+        keep = [c for c in ('status', 'input_description', 'similarity_score') if c in df.columns]
+        df_clean = df.loc[df['similarity_score'].notna().to_numpy(), keep]
+        # One categorical compare, shared by the violin and scatter charts
+        if 'status' in df_clean.columns:
+            no_match = (df_clean['status'] == 'NO MATCH').to_numpy()
+        else:
+            no_match = np.zeros(len(df_clean), dtype=bool)
+        return df_clean, no_match
+
+    @reactive.calc
+    def score_sorted():
+        scores = results_df.get()["similarity_score"].dropna().to_numpy(dtype=np.float64)
+        return np.sort(scores)
+
+    @reactive.calc
+    def score_ecdf():
+        sorted_scores = score_sorted()
+        n = len(sorted_scores)
+        ecdf = np.arange(1, n + 1) / n
+        # np.percentile's linear interpolation, read straight off the sorted array
+        quartiles = np.interp(np.array([0.25, 0.5, 0.75]) * (n - 1), np.arange(n), sorted_scores)
+        return sorted_scores, ecdf, quartiles
+
+    @reactive.calc
+    def score_density():
+        x_range = np.linspace(0, 1, 200)
+        return x_range, binned_gaussian_kde(score_sorted(), x_range)
+
+    @reactive.calc
+    def score_threshold_sweep():
+        sorted_scores = score_sorted()
+        thresholds = np.linspace(0, 1, 101)
+        # Share of scores >= t for every t in one binary search
+        match_rates = 1.0 - np.searchsorted(sorted_scores, thresholds, side="left") / len(sorted_scores)
+        return thresholds, match_rates
+
     # Interactive Plotly visualizations
     @render_widget
     def plotly_viz():
@@ -3853,61 +3834,33 @@ def server(input: Inputs, output: Outputs, session: Session):
         df = results_df.get()
         
         if df.empty:
-            # Return empty figure when no data
-            import plotly.graph_objects as go
-            fig = go.Figure()
-            fig.add_annotation(
-                text="Run mapping to view interactive charts",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5,
-                showarrow=False,
-                font=dict(size=14, color="#666")
-            )
-            fig.update_layout(
-                xaxis=dict(visible=False),
-                yaxis=dict(visible=False),
-                height=400
-            )
-            return fig
+            # Placeholder figures are built once; render_widget copies them into a new widget
+            return _FIG_NO_RESULTS
         
         # Check for similarity score column
         if "similarity_score" not in df.columns:
-            import plotly.graph_objects as go
-            fig = go.Figure()
-            fig.add_annotation(
-                text="No similarity scores available",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5,
-                showarrow=False,
-                font=dict(size=14, color="#666")
-            )
-            fig.update_layout(
-                xaxis=dict(visible=False),
-                yaxis=dict(visible=False),
-                height=400
-            )
-            return fig
+            return _FIG_NO_SCORES
         
         # Get input values - these trigger reactive updates
         viz_type = input.plotly_viz_type()
-        show_threshold = input.show_threshold_line()
-        threshold = input.threshold()
-        
-        import plotly.graph_objects as go
-        from plotly.subplots import make_subplots
-        import numpy as np
+        if viz_type == "threshold":
+            show_threshold = input.show_threshold_line()
+            threshold = input.threshold()
+        else:
+            # Other charts only draw the threshold line; update_threshold_line moves it in place
+            with reactive.isolate():
+                show_threshold = input.show_threshold_line()
+                threshold = input.threshold()
         
         # Keep full dataframe for scatter plot, filter for other plots
-        df_clean = df.dropna(subset=['similarity_score']).copy()
-        scores = df_clean["similarity_score"]
+        df_clean, no_match = scored_rows()
+        # Cached float ndarray; row order only matters for the scatter, which uses df_clean
+        scores = score_sorted()
         
         # Create figure based on visualization type
         if viz_type == "density":
-            # Kernel Density Estimation
-            from scipy import stats
-            density = stats.gaussian_kde(scores)
-            x_range = np.linspace(0, 1, 200)
-            y_density = density(x_range)
+            # Kernel Density Estimation (cached per results frame)
+            x_range, y_density = score_density()
             
             fig = go.Figure()
             
@@ -3923,10 +3876,11 @@ def server(input: Inputs, output: Outputs, session: Session):
                 hovertemplate='Score: %{x:.3f}<br>Density: %{y:.3f}<extra></extra>'
             ))
             
-            # Add rug plot for actual data points
+            # Add rug plot for actual data points (sampled for large runs)
+            rug_x = scores[plot_sample_positions(len(scores))]
             fig.add_trace(go.Scatter(
-                x=scores,
-                y=[-0.01 * max(y_density)] * len(scores),
+                x=rug_x,
+                y=np.full(len(rug_x), -0.01 * y_density.max()),
                 mode='markers',
                 name='Data points',
                 marker=dict(color='#4e79a7', size=2, symbol='line-ns', line=dict(width=1, color='#4e79a7')),
@@ -3953,7 +3907,7 @@ def server(input: Inputs, output: Outputs, session: Session):
             
             # Add statistics annotation
             mean_score = scores.mean()
-            median_score = scores.median()
+            median_score = score_ecdf()[2][1]  # read off the cached sorted scores
             fig.add_annotation(
                 text=f"Mean: {mean_score:.3f}<br>Median: {median_score:.3f}",
                 xref="paper", yref="paper",
@@ -4004,8 +3958,9 @@ def server(input: Inputs, output: Outputs, session: Session):
             fig = go.Figure()
             
             # Split by match status using cleaned dataframe
-            matched_scores = df_clean[df_clean['status'] != 'NO MATCH']['similarity_score']
-            no_match_scores = df_clean[df_clean['status'] == 'NO MATCH']['similarity_score']
+            row_scores = df_clean['similarity_score'].to_numpy()
+            matched_scores = row_scores[~no_match]
+            no_match_scores = row_scores[no_match]
             
             if len(matched_scores) > 0:
                 fig.add_trace(go.Violin(
@@ -4037,14 +3992,14 @@ def server(input: Inputs, output: Outputs, session: Session):
             )
             
         elif viz_type == "scatter":
-            # Scatter plot with color by match status
-            colors = ['#4e79a7' if status != 'NO MATCH' else '#e15759' 
-                     for status in df_clean['status']]
+            # Scatter plot with color by match status; large runs draw a sample of rows
+            shown = plot_sample_positions(len(df_clean))
+            colors = np.where(no_match[shown], '#e15759', '#4e79a7')
             
             fig = go.Figure()
             fig.add_trace(go.Scatter(
-                x=list(range(len(df_clean))),
-                y=df_clean['similarity_score'],
+                x=shown,
+                y=df_clean['similarity_score'].to_numpy()[shown],
                 mode='markers',
                 marker=dict(
                     color=colors,
@@ -4052,7 +4007,7 @@ def server(input: Inputs, output: Outputs, session: Session):
                     opacity=0.6,
                     line=dict(width=1, color='white')
                 ),
-                text=df_clean['input_description'],
+                text=df_clean['input_description'].to_numpy()[shown],
                 hovertemplate='Index: %{x}<br>Score: %{y:.3f}<br>Input: %{text}<extra></extra>'
             ))
             
@@ -4064,8 +4019,7 @@ def server(input: Inputs, output: Outputs, session: Session):
             
         elif viz_type == "ecdf":
             # Empirical Cumulative Distribution Function
-            sorted_scores = np.sort(scores)
-            ecdf = np.arange(1, len(sorted_scores) + 1) / len(sorted_scores)
+            sorted_scores, ecdf, (q25, q50, q75) = score_ecdf()
             
             fig = go.Figure()
             fig.add_trace(go.Scatter(
@@ -4078,7 +4032,6 @@ def server(input: Inputs, output: Outputs, session: Session):
             ))
             
             # Add markers at quartiles
-            q25, q50, q75 = np.percentile(scores, [25, 50, 75])
             fig.add_trace(go.Scatter(
                 x=[q25, q50, q75],
                 y=[0.25, 0.50, 0.75],
@@ -4099,8 +4052,7 @@ def server(input: Inputs, output: Outputs, session: Session):
         
         elif viz_type == "threshold":
             # Threshold Analysis - shows match rate at different thresholds
-            thresholds = np.linspace(0, 1, 101)
-            match_rates = [(scores >= t).mean() for t in thresholds]
+            thresholds, match_rates = score_threshold_sweep()
             
             fig = go.Figure()
             
@@ -4116,7 +4068,8 @@ def server(input: Inputs, output: Outputs, session: Session):
             
             # Add current threshold marker
             if threshold:
-                current_match_rate = (scores >= threshold).mean()
+                sorted_scores = score_sorted()
+                current_match_rate = 1.0 - np.searchsorted(sorted_scores, threshold, side="left") / len(sorted_scores)
                 fig.add_trace(go.Scatter(
                     x=[threshold],
                     y=[current_match_rate],
@@ -4251,13 +4204,9 @@ def server(input: Inputs, output: Outputs, session: Session):
         
         # Add threshold line if requested (but not for sunburst chart where it doesn't apply)
         if show_threshold and threshold and viz_type != "sunburst":
-            fig.add_vline(
-                x=threshold,
-                line_dash="dash",
-                line_color="red",
-                annotation_text=f"Threshold: {threshold:.2f}",
-                annotation_position="top"
-            )
+            shape, label = threshold_marker(threshold)
+            fig.add_shape(shape)
+            fig.add_annotation(label)
         
         # Common layout updates (individual charts already set their axis ranges)
         fig.update_layout(
@@ -4271,6 +4220,26 @@ def server(input: Inputs, output: Outputs, session: Session):
         # Return the Plotly figure directly for render_widget
         return fig
 
+    # Patch the threshold line on the rendered widget instead of rebuilding the figure
+    @reactive.effect
+    def update_threshold_line():
+        show_threshold = input.show_threshold_line()
+        threshold = input.threshold()
+        with reactive.isolate():
+            if results_df.get().empty or input.plotly_viz_type() in ("threshold", "sunburst"):
+                return
+            widget = plotly_viz.widget
+        shapes = [s for s in widget.layout.shapes if s.name != THRESHOLD_MARKER]
+        labels = [a for a in widget.layout.annotations if a.name != THRESHOLD_MARKER]
+        if show_threshold and threshold:
+            shape, label = threshold_marker(threshold)
+            shapes.append(shape)
+            labels.append(label)
+        with widget.batch_update():
+            widget.layout.shapes = shapes
+            widget.layout.annotations = labels
+
 # Create the app
-app = App(app_ui, server)
+app = App(app_ui, server, static_assets={"/static": ASSETS_DIR})
+app.starlette_app.add_middleware(ImmutableStaticMiddleware)
 
@@ -0,0 +1,45 @@
+"""Check that streamed CSV downloads are byte-for-byte DataFrame.to_csv output.
+
+Uses a mixed-type frame (quoted strings, missing values, whole floats,
+booleans, datetimes, mixed object columns) and a chunk size that splits it:
+
+    python tools/check_csv_export.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+
+def main() -> int:
+    n = 25
+    df = pd.DataFrame({
+        "input": [f"item {i}, raw" if i % 3 else f'say "{i}"' for i in range(n)],
+        "match": [None if i % 7 == 0 else f"target {i}" for i in range(n)],
+        "score": [float(i % 2) if i % 4 else 0.875 for i in range(n)],
+        "rank": np.arange(n),
+        "flag": [i % 2 == 0 for i in range(n)],
+        "when": pd.date_range("2024-01-01", periods=n, freq="h"),
+        "mixed": [i if i % 2 else f"x{i}" for i in range(n)],
+        "status": ["NO MATCH" if i % 5 == 0 else "Match" for i in range(n)],
+    })
+    for chunk_rows in (1, 4, n, 5000):
+        streamed = "".join(app.iter_csv_chunks(df, chunk_rows=chunk_rows))
+        if streamed != df.to_csv(index=False):
+            print(f"FAIL: chunk_rows={chunk_rows} output differs from df.to_csv(index=False)")
+            return 1
+    if "".join(app.iter_csv_chunks(df.iloc[:0])) != df.iloc[:0].to_csv(index=False):
+        print("FAIL: empty frame output differs from df.to_csv(index=False)")
+        return 1
+    print("streamed CSV matches df.to_csv(index=False) for every chunk size")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""Check that fuzzy matching sizes its cdist block from the target count.
+
+A (rows, len(targets)) float32 block must stay within the memory budget for
+large reference tables, and blocking must not change the winners:
+
+    python tools/check_fuzzy_block.py
+"""
+
+import random
+import string
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+
+def _texts(rng: random.Random, n: int) -> list:
+    return ["".join(rng.choices(string.ascii_lowercase + " ", k=rng.randint(5, 30))) for _ in range(n)]
+
+
+def main() -> int:
+    for n_targets in (1, 1_000, 100_000, 10_000_000, 100_000_000):
+        rows = app.fuzzy_block_rows(n_targets)
+        if rows < 1 or (rows > 1 and rows * n_targets * 4 > app._FUZZY_BLOCK_BYTES):
+            print(f"FAIL: {rows} rows x {n_targets:,} targets exceeds the block budget")
+            return 1
+        print(f"{n_targets:>11,} targets -> {rows:>5} rows per block ({rows * n_targets * 4 / 2**20:.1f} MiB)")
+
+    rng = random.Random(0)
+    inputs, targets = _texts(rng, 400), _texts(rng, 100_000)
+    default = app.run_fuzzy_match(inputs, targets)
+    one_block = app.run_fuzzy_match(inputs, targets, block_size=len(inputs))
+    if default != one_block:
+        print("FAIL: bounded blocks changed the winners")
+        return 1
+    print(f"100,000 targets: bounded blocks match a single block for {len(inputs)} inputs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""Check that fuzzy-prefiltered matching is exact by default and report its error when enabled.
+
+With FUZZY_PREFILTER_TOP_M unset (0) every target is scored, so winners must
+equal the exact argmax. Pass a shortlist size to see how far the prefilter
+drifts from it on a synthetic corpus:
+
+    python tools/check_prefilter.py [top_m]
+"""
+
+import os
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.pop("FUZZY_PREFILTER_TOP_M", None)
+
+import app  # noqa: E402
+
+_WORDS = ["apple", "banana", "cheese", "chicken", "raw", "cooked", "fried", "whole", "milk", "bread",
+          "rice", "brown", "white", "sauce", "tomato", "salted", "frozen", "canned", "juice", "beef"]
+
+
+def _texts(rng: random.Random, n: int) -> list:
+    return [" ".join(rng.sample(_WORDS, rng.randint(2, 5))) for _ in range(n)]
+
+
+def main() -> int:
+    top_m = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rng = random.Random(0)
+    np_rng = np.random.default_rng(0)
+    queries, corpus = _texts(rng, 300), _texts(rng, 2000)
+    A = app.encode_for_scoring(np_rng.standard_normal((len(queries), 64)).astype(np.float32))
+    B = app.encode_for_scoring(np_rng.standard_normal((len(corpus), 64)).astype(np.float32))
+    exact = (A.astype(np.float32) @ B.astype(np.float32).T).argmax(axis=1)
+
+    if app.FUZZY_PREFILTER_TOP_M != 0:
+        print(f"FAIL: FUZZY_PREFILTER_TOP_M defaults to {app.FUZZY_PREFILTER_TOP_M}, expected 0")
+        return 1
+    idx, _ = app.best_match(A, B)
+    if not np.array_equal(idx, exact):
+        print(f"FAIL: default path differs from exact argmax on {int((idx != exact).sum())} rows")
+        return 1
+    print("default (prefilter off): winners match the exact argmax")
+
+    idx, scores = app.prefiltered_best_match(A, B, queries, corpus, top_m)
+    exact_scores = np.einsum("nd,nd->n", A.astype(np.float32), B[exact].astype(np.float32))
+    changed = int((idx != exact).sum())
+    print(f"top_m={top_m}: {changed}/{len(queries)} winners changed, "
+          f"max score error {float((exact_scores - scores).max()):.3f} (approximate)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""Check that prepared targets are filed under the backend that built them.
+
+Simulates the CPU fallback tripping while the target matrix is being built,
+then checks the in-memory entry lands under the "local" key and is not served
+to the next (API) run:
+
+    python tools/check_prepared_targets.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+
+async def _targets_tripping_fallback(target_list, api_key, progress_callback=None, compute=None):
+    app.FALLBACK_ACTIVE = True  # circuit opens partway through the build
+    return app.encode_for_scoring(np.random.default_rng(0).standard_normal((len(target_list), 16)).astype(np.float32))
+
+
+async def _inputs(texts, api_key, progress_callback=None, compute=None):
+    return np.random.default_rng(1).standard_normal((len(texts), 16)).astype(np.float32)
+
+
+def main() -> int:
+    app.MODEL_FALLBACK_MODE = "auto"
+    app.FALLBACK_ACTIVE = False
+    app.get_or_compute_target_matrix = _targets_tripping_fallback
+    app.compute_embeddings_resilient_async = _inputs
+    app._PREPARED_TARGETS.clear()
+
+    targets = ["apple raw", "banana", "cheddar cheese"]
+    asyncio.run(app.run_embed_match_async(["apple"], targets, api_key="unused"))
+
+    unique_targets, _ = app.distinct_embedding_targets(targets, clean_target=False)
+    keys = list(app._PREPARED_TARGETS)
+    if keys != [app._prepared_targets_key(unique_targets, "local")]:
+        print(f"FAIL: prepared targets filed under {keys}, expected the local backend")
+        return 1
+    app.FALLBACK_ACTIVE = False  # what the next run starts with
+    if app._prepared_targets_key(unique_targets, app._embedding_backend()) in app._PREPARED_TARGETS:
+        print("FAIL: local target vectors would be reused by an API run")
+        return 1
+    print("fallback tripped mid-build: prepared targets filed under the local backend only")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""Minify each assets/<name>.css into assets/<name>.min.css.
+
+Run after editing the stylesheet:
+
+    python tools/minify_css.py
+"""
+
+import re
+import sys
+from pathlib import Path
+
+ASSETS = Path(__file__).resolve().parent.parent / "assets"
+
+
+_STRING_RE = re.compile(r"""("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')""")
+
+
+def _minify_code(css: str) -> str:
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    css = re.sub(r"\(\s+", "(", css)
+    css = re.sub(r"\s+\)", ")", css)
+    return css.replace(";}", "}")
+
+
+def minify_css(css: str) -> str:
+    """Strip comments and redundant whitespace; quoted strings are left untouched."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    parts = _STRING_RE.split(css)
+    # Odd indexes are the captured string literals
+    return "".join(part if i % 2 else _minify_code(part) for i, part in enumerate(parts)).strip()
+
+
+def main() -> int:
+    for source in sorted(ASSETS.glob("*.css")):
+        if source.name.endswith(".min.css"):
+            continue
+        target = source.with_name(f"{source.stem}.min.css")
+        css = source.read_text(encoding="utf-8")
+        minified = minify_css(css)
+        target.write_text(minified + "\n", encoding="utf-8")
+        print(f"{source.name}: {len(css):,} -> {target.name}: {len(minified):,} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())